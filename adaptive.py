@@ -0,0 +1,392 @@
+"""
+Adaptive Question Selection
+
+Picks the next trivia question by weighted random sampling instead of asking
+questions 1..N in order. Each question's weight comes from how it has played so
+far: questions that are often answered wrongly, or that take longer than average
+to answer, come up more often.
+
+Weights live in a Fenwick (binary indexed) tree, so both drawing a question and
+updating a weight take O(log n), which keeps selection instant on banks of
+hundreds of thousands of questions. Per-question statistics are kept in flat
+arrays and saved to a small binary file.
+
+Questions are identified by their 0-based position in the question pack. Given
+the pack's record digests, statistics are saved with the digest of their
+question and follow it to its new position when the pack is recompiled (see
+`question_store.relocate`), so adding or removing a question does not shift the
+history of the others.
+
+Classes:
+- FenwickSampler: Weighted sampling over a Fenwick tree.
+- AdaptiveSelector: Chooses questions for a quiz session and learns from the answers.
+"""
+import os
+import random
+import struct
+from array import array
+from itertools import chain, repeat
+
+from question_store import relocate
+
+
+STATS_MAGIC = b"NSQD"
+# Statistics saved by position only, before digests were recorded
+LEGACY_STATS_MAGIC = b"NSQS"
+_STATS = (("asked", 0), ("wrong", 0), ("timed", 0), ("seconds", 0.0))
+_STATS_HEADER = struct.Struct("<4sI")
+
+# Bounds of the answer-time factor applied to a question's weight
+MIN_PACE = 0.5
+MAX_PACE = 2.0
+
+
+class FenwickSampler:
+    """
+    Draws indices with probability proportional to their weight.
+    Setting a weight and drawing an index both run in O(log n).
+    """
+
+    def __init__(self, weights):
+        """
+        Args:
+            weights (iterable): Initial non-negative weight of each index.
+        """
+
+        self.weights = array("d", weights)
+        self.size = len(self.weights)
+        self._tree = array("d", [0.0]) * (self.size + 1)
+        # Linear-time build: push each node's sum up to its parent
+        for i in range(1, self.size + 1):
+            self._tree[i] += self.weights[i - 1]
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self._tree[parent] += self._tree[i]
+        self._top = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def __len__(self):
+        return self.size
+
+    def set(self, index, weight):
+        """
+        Changes the weight of an index.
+        Args:
+            index (int): 0-based index.
+            weight (float): The new non-negative weight.
+        """
+
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        i = index + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def total(self):
+        """
+        Returns:
+            float: The sum of all weights.
+        """
+
+        total, i = 0.0, self.size
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, value):
+        """
+        Finds the index whose cumulative weight range contains `value`.
+        Args:
+            value (float): A number in [0, total()).
+        Returns:
+            int: The 0-based index.
+        """
+
+        position, step = 0, self._top
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self._tree[nxt] <= value:
+                position = nxt
+                value -= self._tree[nxt]
+            step >>= 1
+        return min(position, self.size - 1)
+
+    def sample(self, rng=random):
+        """
+        Draws an index at random, weighted by the current weights.
+        Args:
+            rng (random.Random, optional): Source of randomness.
+        Returns:
+            int or None: A 0-based index, or None if every weight is zero.
+        """
+
+        total = self.total()
+        if total <= 0:
+            return None
+        index = self.find(rng.random() * total)
+        if self.weights[index] <= 0:
+            # Float rounding landed on a zero-weight neighbour; take the nearest live one
+            for neighbour in chain(range(index - 1, -1, -1), range(index + 1, self.size)):
+                if self.weights[neighbour] > 0:
+                    return neighbour
+            return None
+        return index
+
+
+def _weight(asked, wrong, timed, seconds, mean_time):
+    weight = (wrong + 1) / (asked + 2)
+    if timed and mean_time > 0:
+        pace = seconds / timed / mean_time
+        weight *= min(max(pace, MIN_PACE), MAX_PACE)
+    return weight
+
+
+class AdaptiveSelector:
+    """
+    Chooses the questions of a quiz session and updates their weights from the answers.
+    A question's weight is its smoothed error rate, (wrong + 1) / (asked + 2), scaled
+    by how its mean answer time compares with the mean over all questions (clamped
+    to [MIN_PACE, MAX_PACE]). A question is not repeated within one session.
+
+    Adapting to a changed bank is O(n), so it is split in three for callers that
+    must not block: `snapshot` copies the statistics, `plan_resize` builds the new
+    ones from the copy (in a worker thread, say) and `apply_resize` swaps them in,
+    carrying over the answers recorded in between. `resize` does all three.
+    """
+
+    def __init__(self, count, stats_path=None, rng=None, digests=None):
+        """
+        Args:
+            count (int): Number of questions in the bank.
+            stats_path (str, optional): File the statistics are loaded from and saved to.
+            rng (random.Random, optional): Source of randomness.
+            digests (array, optional): Record digest of each position, as from
+                `QuestionStore.digests`. With them, statistics are saved by digest and
+                follow their question when the pack changes; without, they stay with
+                their position.
+        """
+
+        self.stats_path = stats_path
+        self.rng = rng or random.Random()
+        # Record digest of the question at each position, when known
+        self.digests = None
+        self.asked = array("I")
+        self.wrong = array("I")
+        self.timed = array("I")
+        self.seconds = array("d")
+        self._journal = None
+        if stats_path:
+            self.load()
+        self._asked_this_session = []
+        relocation = None
+        if digests is not None and self.digests is not None:
+            relocation = relocate(self.digests, digests)
+        self.resize(count, relocation, digests)
+
+    def __len__(self):
+        return len(self.asked)
+
+    def resize(self, count, relocation=None, digests=None):
+        """
+        Adapts to a changed bank, e.g. after the question pack is reloaded.
+        Args:
+            count (int): The new number of questions.
+            relocation (array, optional): New position of each current position, -1 for
+                questions no longer in the bank, as from `question_store.relocate`.
+                Statistics move with their question. Without it statistics stay where
+                they are and those of positions beyond the new size are dropped.
+            digests (array, optional): The new record digest of each position.
+        """
+
+        self.apply_resize(self.plan_resize(self.snapshot(), count, relocation, digests), relocation)
+
+    def snapshot(self):
+        """
+        Copies the statistics for `plan_resize`. Answers recorded from now on are
+        kept aside until `apply_resize`.
+        Returns:
+            dict: Statistic name to a copy of its array.
+        """
+
+        self._journal = []
+        return {name: getattr(self, name)[:] for name, _ in _STATS}
+
+    @staticmethod
+    def plan_resize(snapshot, count, relocation=None, digests=None):
+        """
+        Builds the statistics and sampler for a changed bank from a snapshot.
+        Touches no selector, so it can run in a worker thread.
+        Args:
+            snapshot (dict): From `snapshot`.
+            count, relocation, digests: As for `resize`.
+        Returns:
+            dict: The plan for `apply_resize`.
+        """
+
+        plan = {"count": count, "digests": digests}
+        if relocation is None:
+            for name, zero in _STATS:
+                stats = snapshot[name]
+                if len(stats) > count:
+                    del stats[count:]
+                else:
+                    stats.extend([zero] * (count - len(stats)))
+                plan[name] = stats
+        else:
+            moved = array("q", [-1]) * count
+            for position, new_position in enumerate(relocation):
+                if 0 <= new_position < count:
+                    moved[new_position] = position
+            for name, zero in _STATS:
+                stats = snapshot[name]
+                plan[name] = array(stats.typecode, (zero if row < 0 else stats[row] for row in moved))
+
+        plan["total_timed"] = sum(plan["timed"])
+        plan["total_seconds"] = sum(plan["seconds"])
+        mean_time = plan["total_seconds"] / plan["total_timed"] if plan["total_timed"] else 0.0
+        plan["sampler"] = FenwickSampler(map(_weight, plan["asked"], plan["wrong"], plan["timed"], plan["seconds"], repeat(mean_time)))
+        return plan
+
+    def apply_resize(self, plan, relocation=None):
+        """
+        Swaps in the statistics built by `plan_resize`, adding the answers recorded
+        since the snapshot and keeping the questions asked this session out of the draw.
+        Args:
+            plan (dict): From `plan_resize`.
+            relocation (array, optional): The relocation the plan was built with.
+        """
+
+        count = plan["count"]
+
+        def moved(position):
+            new_position = position if relocation is None else relocation[position] if position < len(relocation) else -1
+            return new_position if 0 <= new_position < count else None
+
+        journal, self._journal = self._journal or [], None
+        self.asked, self.wrong, self.timed, self.seconds = plan["asked"], plan["wrong"], plan["timed"], plan["seconds"]
+        self.digests = plan["digests"]
+        self._total_timed, self._total_seconds = plan["total_timed"], plan["total_seconds"]
+        self._update_mean_time()
+        self._asked_this_session = [position for position in map(moved, self._asked_this_session) if position is not None]
+        for position, correct, seconds in journal:
+            position = moved(position)
+            if position is not None:
+                self._count(position, correct, seconds)
+        self.sampler = plan["sampler"]
+        for position in self._asked_this_session:
+            self.sampler.set(position, 0.0)
+
+    def cancel_resize(self):
+        """
+        Stops keeping answers aside after a `snapshot` whose plan will not be applied.
+        """
+
+        self._journal = None
+
+    def _update_mean_time(self):
+        self._mean_time = self._total_seconds / self._total_timed if self._total_timed else 0.0
+
+    def weight(self, position):
+        """
+        Computes the sampling weight of a question from its statistics.
+        Args:
+            position (int): 0-based position of the question.
+        Returns:
+            float: The weight.
+        """
+
+        return _weight(self.asked[position], self.wrong[position], self.timed[position], self.seconds[position], self._mean_time)
+
+    def start(self):
+        """
+        Starts a new session: questions asked in the previous one can be drawn again.
+        """
+
+        for position in self._asked_this_session:
+            self.sampler.set(position, self.weight(position))
+        self._asked_this_session = []
+
+    def pick(self):
+        """
+        Draws the next question and keeps it out of the draw for the rest of the session.
+        Returns:
+            int: 0-based position of the question.
+        """
+
+        position = self.sampler.sample(self.rng)
+        if position is None:
+            # Every question was asked in this session already
+            self.start()
+            position = self.sampler.sample(self.rng)
+            if position is None:
+                position = self.rng.randrange(len(self.sampler))
+        self.sampler.set(position, 0.0)
+        self._asked_this_session.append(position)
+        return position
+
+    def record(self, position, correct, seconds=None):
+        """
+        Updates a question's statistics with one answer.
+        The question's new weight is applied when the next session starts.
+        Args:
+            position (int): 0-based position of the question.
+            correct (bool): Whether the answer was correct.
+            seconds (float, optional): Time taken to answer. Answers without a time
+                count towards the error rate only.
+        """
+
+        if self._journal is not None:
+            self._journal.append((position, correct, seconds))
+        self._count(position, correct, seconds)
+
+    def _count(self, position, correct, seconds):
+        self.asked[position] += 1
+        if not correct:
+            self.wrong[position] += 1
+        if seconds is not None:
+            self.timed[position] += 1
+            self.seconds[position] += seconds
+            self._total_timed += 1
+            self._total_seconds += seconds
+            self._mean_time = self._total_seconds / self._total_timed
+
+    def load(self):
+        """
+        Loads the statistics from `stats_path`. A missing or unreadable file leaves them empty.
+        """
+
+        try:
+            with open(self.stats_path, "rb") as f:
+                magic, count = _STATS_HEADER.unpack(f.read(_STATS_HEADER.size))
+                if magic not in (STATS_MAGIC, LEGACY_STATS_MAGIC):
+                    return
+                digests = None
+                if magic == STATS_MAGIC:
+                    digests = array("Q")
+                    digests.fromfile(f, count)
+                asked, wrong, timed, seconds = array("I"), array("I"), array("I"), array("d")
+                for stats in (asked, wrong, timed, seconds):
+                    stats.fromfile(f, count)
+        except (OSError, EOFError, struct.error):
+            return
+        self.asked, self.wrong, self.timed, self.seconds = asked, wrong, timed, seconds
+        self.digests = digests
+
+    def save(self):
+        """
+        Writes the statistics to `stats_path`, atomically replacing the previous file.
+        """
+
+        if not self.stats_path:
+            return
+        tmp_path = f"{self.stats_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            if self.digests is None:
+                f.write(_STATS_HEADER.pack(LEGACY_STATS_MAGIC, len(self.asked)))
+            else:
+                f.write(_STATS_HEADER.pack(STATS_MAGIC, len(self.asked)))
+                self.digests.tofile(f)
+            for stats in (self.asked, self.wrong, self.timed, self.seconds):
+                stats.tofile(f)
+        os.replace(tmp_path, self.stats_path)
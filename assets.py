@@ -0,0 +1,98 @@
+"""
+Assets
+
+Process-wide registry of fonts and images. Fonts are interned by
+(family, size, weight), so every widget asking for the same font shares one
+CTkFont and Tk only creates it once. Images are decoded once per path.
+
+Each request can name an owner widget; the reference it took is dropped when
+the owner is garbage collected, and an asset nobody references any more is
+removed from the registry.
+
+Classes:
+- AssetRegistry: Interned fonts and cached images with reference counts.
+
+Attributes:
+- assets: The shared registry.
+"""
+import weakref
+from tkinter import PhotoImage
+
+import customtkinter as ctk
+
+
+class AssetRegistry:
+    """
+    Interned fonts and decoded images, with a reference count per asset.
+    Fonts handed out are shared, so they must not be reconfigured by their users.
+    Assets can only be created once the Tk root window exists.
+    """
+
+    def __init__(self):
+        # key -> [asset, reference count]
+        self._entries = {}
+
+    def _acquire(self, key, factory, owner):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [factory(), 0]
+        entry[1] += 1
+        if owner is not None:
+            weakref.finalize(owner, self.release, key)
+        return entry[0]
+
+    def font(self, size=None, weight=None, family=None, owner=None):
+        """
+        Returns the shared CTkFont for a family, size and weight.
+        Args:
+            size (int, optional): Font size. Defaults to the theme's size.
+            weight (str, optional): "normal" or "bold". Defaults to the theme's weight.
+            family (str, optional): Font family. Defaults to the theme's family.
+            owner (optional): Object whose lifetime the reference is tied to, usually a widget.
+        Returns:
+            ctk.CTkFont: The interned font.
+        """
+
+        return self._acquire(("font", family, size, weight), lambda: ctk.CTkFont(family=family, size=size, weight=weight), owner)
+
+    def image(self, path, owner=None):
+        """
+        Returns the decoded image at `path`, loading it on first use.
+        Args:
+            path (str): Image file.
+            owner (optional): Object whose lifetime the reference is tied to.
+        Returns:
+            PhotoImage: The cached image.
+        """
+
+        return self._acquire(("image", path), lambda: PhotoImage(file=path), owner)
+
+    def release(self, key):
+        """
+        Drops one reference to an asset, removing it once nothing references it.
+        Args:
+            key (tuple): The asset's registry key.
+        """
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._entries[key]
+
+    def stats(self):
+        """
+        Returns:
+            dict: Number of fonts, images and references currently held.
+        """
+
+        kinds = [key[0] for key in self._entries]
+        return {
+            "fonts": kinds.count("font"),
+            "images": kinds.count("image"),
+            "references": sum(entry[1] for entry in self._entries.values()),
+        }
+
+
+assets = AssetRegistry()
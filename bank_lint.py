@@ -0,0 +1,296 @@
+"""
+Bank Lint
+
+Validates question banks too large to load into memory.
+
+The bank (a JSON object with a top-level "questions" mapping of question /
+answers / correct entries, as in data/packs/en/computing.json) is read in
+chunks and parsed incrementally: only the current chunk and the question being
+decoded are held by the parser. Decoded questions are checked in batches by a
+pool of worker processes with `question_store.validate_entry`, and only a few
+batches are in flight at a time, so memory use does not depend on the bank size.
+
+Every problem is reported as PATH:LINE:COLUMN: message, in file order. Question
+problems point at the start of the question. A syntax error points at the
+offending character and stops the run, since nothing after it can be trusted.
+
+Classes:
+- BankReader: Incremental reader yielding the questions of a bank.
+- LintError: A syntax or structure error at a line and column.
+
+Functions:
+- lint: Checks a bank and reports its problems.
+
+Usage:
+python bank_lint.py [BANK] [--jobs N] [--batch-size N]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+from collections import deque
+
+from question_store import DEFAULT_SOURCE, validate_entry
+
+
+CHUNK_SIZE = 1 << 20
+# A single question (or any other value) larger than this is reported instead of buffered
+MAX_VALUE_SIZE = 16 << 20
+BATCH_SIZE = 512
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# What a value cut off at the end of the buffer can end with: part of a number or literal
+_PARTIAL_TOKEN = re.compile(r"[ \t\n\r]*(?:[-+.0-9eE]*|t(?:r(?:ue?)?)?|f(?:a(?:l(?:se?)?)?)?|n(?:u(?:ll?)?)?|N(?:aN?)?|I(?:n(?:f(?:i(?:n(?:i(?:ty?)?)?)?)?)?)?)")
+
+
+class LintError(Exception):
+    """
+    A syntax or structure error that stops the bank from being read further.
+    """
+
+    def __init__(self, line, column, message):
+        super().__init__(f"{line}:{column}: {message}")
+        self.line = line
+        self.column = column
+        self.message = message
+
+
+class BankReader:
+    """
+    Incremental parser for a question bank.
+    The file is read CHUNK_SIZE characters at a time. The structure around the
+    questions is tokenized directly; each question value is decoded on its own
+    with the standard JSON decoder once it is fully buffered.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE, max_value_size=MAX_VALUE_SIZE):
+        """
+        Args:
+            f: A text file opened for reading.
+            chunk_size (int, optional): Characters read at a time.
+            max_value_size (int, optional): Largest single value, in characters, that is buffered.
+        """
+
+        self.f = f
+        self.chunk_size = chunk_size
+        self.max_value_size = max_value_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        # Absolute offset of _buffer[0], and how far lines have been counted
+        self._base = 0
+        self._counted = 0
+        self._line = 1
+        self._line_start = 0
+
+    def location(self, pos=None):
+        """
+        Returns the (line, column) of a buffer position, both 1-based.
+        Positions must not move backwards past the last one located.
+        """
+
+        absolute = self._base + (self._pos if pos is None else pos)
+        if absolute > self._counted:
+            start, end = self._counted - self._base, absolute - self._base
+            newlines = self._buffer.count("\n", start, end)
+            if newlines:
+                self._line += newlines
+                self._line_start = self._base + self._buffer.rfind("\n", start, end) + 1
+            self._counted = absolute
+        return self._line, absolute - self._line_start + 1
+
+    def _error(self, message, pos=None):
+        line, column = self.location(pos)
+        return LintError(line, column, message)
+
+    def _fill(self):
+        if self._eof:
+            return False
+        if self._pos >= self.chunk_size:
+            # Drop what has been parsed, keeping line numbers in step
+            self.location()
+            self._buffer = self._buffer[self._pos:]
+            self._base += self._pos
+            self._pos = 0
+        try:
+            chunk = self.f.read(self.chunk_size)
+        except UnicodeDecodeError as e:
+            raise self._error(f"file is not valid UTF-8 ({e.reason})", len(self._buffer))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer += chunk
+        return True
+
+    def _peek(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, characters, what):
+        character = self._peek()
+        if not character or character not in characters:
+            found = repr(character) if character else "end of file"
+            raise self._error(f"expected {what}, found {found}")
+        self._pos += 1
+        return character
+
+    def _value(self):
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                if not self._truncated(e):
+                    raise self._error(e.msg, e.pos)
+                # The value is just not fully buffered yet
+                if len(self._buffer) - self._pos < self.max_value_size and self._fill():
+                    continue
+                if not self._eof:
+                    raise self._error(f"value is larger than {self.max_value_size} characters")
+                raise self._error(e.msg, e.pos)
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _truncated(self, e):
+        # Whether decoding failed because the buffer ran out rather than on a syntax error
+        if self._eof:
+            return False
+        # An escape cut off in the middle fails a few characters before the end
+        if e.msg.startswith("Unterminated string") or len(self._buffer) - e.pos <= len("\\uXXXX"):
+            return True
+        return _PARTIAL_TOKEN.fullmatch(self._buffer, e.pos) is not None
+
+    def _key(self):
+        if self._peek() != '"':
+            raise self._error("expected a property name in double quotes")
+        return self._value()
+
+    def _members(self):
+        # Yields each key of the object at the current position, leaving the position at its value
+        self._expect("{", "'{'")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._key()
+            self._expect(":", "':'")
+            self._peek()
+            yield key
+            if self._expect(",}", "',' or '}'") == "}":
+                return
+
+    def questions(self):
+        """
+        Yields every question of the bank.
+        Yields:
+            tuple: (key, entry, line, column) where entry is the decoded question and
+            line and column locate its first character.
+        Raises:
+            LintError: On a syntax error, or if the bank has no "questions" object.
+        """
+
+        found = False
+        for name in self._members():
+            if name != "questions":
+                self._value()
+                continue
+            if self._peek() != "{":
+                raise self._error("'questions' must be an object")
+            found = True
+            for key in self._members():
+                line, column = self.location()
+                yield key, self._value(), line, column
+        if self._peek():
+            raise self._error("unexpected data after the bank")
+        if not found:
+            raise self._error("the bank has no 'questions' object")
+
+
+def _check_batch(batch):
+    # Runs in a worker process
+    return [(line, column, error) for key, entry, line, column in batch for error in validate_entry(key, entry)]
+
+
+def lint(path, jobs=None, batch_size=BATCH_SIZE, out=sys.stdout):
+    """
+    Checks the bank at `path` and prints its problems to `out`.
+    Args:
+        path (str): The JSON bank.
+        jobs (int, optional): Worker processes. Defaults to the number of CPUs; 1 checks in this process.
+        batch_size (int, optional): Questions sent to a worker at a time.
+        out (optional): Where problems are written.
+    Returns:
+        tuple: (number of questions checked, number of problems found).
+    """
+
+    jobs = jobs or os.cpu_count() or 1
+    checked = problems = 0
+
+    def report(results):
+        nonlocal problems
+        for line, column, error in results:
+            print(f"{path}:{line}:{column}: {error}", file=out)
+        problems += len(results)
+
+    pool = multiprocessing.Pool(jobs) if jobs > 1 else None
+    pending = deque()
+
+    def submit(batch):
+        nonlocal checked
+        checked += len(batch)
+        if pool is None:
+            report(_check_batch(batch))
+            return
+        pending.append(pool.apply_async(_check_batch, (batch,)))
+        # Bound the questions held in memory by the batches in flight
+        if len(pending) >= 2 * jobs:
+            report(pending.popleft().get())
+
+    batch = []
+    stopped = None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                for question in BankReader(f).questions():
+                    batch.append(question)
+                    if len(batch) == batch_size:
+                        submit(batch)
+                        batch = []
+            except LintError as e:
+                stopped = e
+        if batch:
+            submit(batch)
+        while pending:
+            report(pending.popleft().get())
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    if stopped:
+        report([(stopped.line, stopped.column, stopped.message)])
+    return checked, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate a question bank without loading it into memory.")
+    parser.add_argument("bank", nargs="?", default=DEFAULT_SOURCE, help="JSON bank to check")
+    parser.add_argument("--jobs", "-j", type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="questions per worker task")
+    args = parser.parse_args(argv)
+
+    checked, problems = lint(args.bank, jobs=args.jobs, batch_size=args.batch_size)
+    print(f"Checked {checked} questions in {args.bank}: {problems or 'no'} problem(s) found", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
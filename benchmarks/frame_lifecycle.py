@@ -0,0 +1,95 @@
+"""
+Frame lifecycle benchmark
+
+Drives `App.show_frame` through thousands of simulated screen transitions and
+checks that the number of live Tk widgets and pending `after` callbacks stays
+bounded, i.e. that frames are reused instead of being rebuilt on every transition,
+and that destroying the trivia screen cancels its polling loops. Only screen changes are
+simulated; no answers are submitted, so the game never ends.
+
+Usage:
+python benchmarks/frame_lifecycle.py [--transitions N]
+
+Note:
+Needs a display (or Xvfb) since real widgets are created.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from main import App  # noqa: E402
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def pending_jobs(app):
+    return set(app.tk.splitlist(app.tk.call("after", "info")))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that the widget count stays bounded across screen transitions.")
+    parser.add_argument("--transitions", type=int, default=5000, help="number of screen changes to simulate")
+    args = parser.parse_args(argv)
+
+    app = App()
+    app.withdraw()
+    route = [
+        lambda current: app.show_frame(current, app.trivia_screen),
+        lambda current: app.show_frame(current, app.loader_screen, title="Loading", summary="Please wait."),
+        lambda current: app.show_frame(current, app.notice_screen, title="Notice", summary="Play again?"),
+        lambda current: app.show_frame(current, app.welcome_screen),
+    ]
+
+    current = app.welcome_screen
+    # One full lap builds every frame; everything after that must reuse them
+    for step in route:
+        current = step(current)
+    app.update_idletasks()
+    baseline = count_widgets(app)
+    baseline_jobs = len(pending_jobs(app))
+
+    peak = baseline
+    peak_jobs = baseline_jobs
+    start = time.perf_counter()
+    for i in range(args.transitions):
+        current = route[i % len(route)](current)
+        if i % 100 == 0:
+            app.update_idletasks()
+            peak = max(peak, count_widgets(app))
+            peak_jobs = max(peak_jobs, len(pending_jobs(app)))
+    elapsed = time.perf_counter() - start
+    app.update_idletasks()
+    final = count_widgets(app)
+    trivia = app.trivia_screen
+    jobs = {trivia._poll_job, trivia._flush_job}
+    trivia.destroy()
+    leaked = jobs & pending_jobs(app)
+    app.destroy()
+
+    print(f"transitions: {args.transitions}")
+    print(f"widgets after first lap: {baseline}, peak: {peak}, final: {final}")
+    print(f"pending after callbacks after first lap: {baseline_jobs}, peak: {peak_jobs}")
+    print(f"mean transition time: {elapsed / args.transitions * 1000:.3f} ms")
+    if peak > baseline:
+        print("FAIL: widget count grew across transitions")
+        return 1
+    # A screen change may leave a debounce callback pending; a leak grows with every lap instead
+    if peak_jobs > baseline_jobs + len(route):
+        print("FAIL: pending after callbacks grew across transitions")
+        return 1
+    if leaked:
+        print("FAIL: the trivia screen left its polling loops scheduled after it was destroyed")
+        return 1
+    print("OK: widget count and pending callbacks are bounded")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Leaderboard benchmark
+
+Fills a scratch leaderboard with millions of scores spread over many days, then
+measures a cold rebuild from the log, a warm start from the snapshot plus a log
+tail, and all-time and per-day top-10 queries.
+
+Usage:
+python benchmarks/leaderboard_bench.py [--entries N] [--days D]
+"""
+import argparse
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from leaderboard import RECORD, Leaderboard, _day  # noqa: E402
+
+
+def write_log(path, entries, days, rng):
+    """
+    Writes `entries` records straight to the log, as a long-running game would have.
+    """
+
+    start = time.time() - days * 86400
+    with open(path, "wb") as f:
+        batch = []
+        for i in range(entries):
+            body = RECORD.pack(start + i * days * 86400 / entries, rng.randint(0, 20), 20, f"player{i % 5000}".encode(), 0)[:-4]
+            batch.append(body + struct.pack("<I", zlib.crc32(body)))
+            if len(batch) == 100_000:
+                f.write(b"".join(batch))
+                batch.clear()
+        f.write(b"".join(batch))
+
+
+def timed(label, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{label:<36} {(time.perf_counter() - start) * 1000:10.2f} ms")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark leaderboard startup and queries.")
+    parser.add_argument("--entries", type=int, default=2_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "leaderboard.log")
+        write_log(path, args.entries, args.days, rng)
+        print(f"{args.entries} entries over {args.days} days")
+
+        board = Leaderboard(path, durable=False)
+        timed("cold rebuild from log", board._open)
+        board.save_snapshot()
+        board.close()
+
+        # Games recorded after the snapshot form the tail replayed at startup
+        tail = Leaderboard(path, durable=False)
+        tail._open()
+        tail._unsnapshotted = -10 ** 9
+        for _ in range(10_000):
+            tail.record(rng.randint(0, 20), 20)
+        os.close(tail._fd)
+
+        board = Leaderboard(path, durable=False)
+        timed("warm start: snapshot + 10k tail", board._open)
+        timed("all-time top 10", lambda: board.top(10))
+        day = _day(time.time() - args.days * 86400 / 2)
+        timed(f"top 10 for {day}", lambda: board.top(10, day=day))
+        timed("record one score (no fsync)", lambda: board.record(20, 20, "bench"))
+        board.durable = True
+        timed("record one score (fsync)", lambda: board.record(20, 20, "bench"))
+        board.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Bank lint benchmark
+
+Writes a large synthetic question bank (with one invalid question in every
+thousand) and lints it with one process and with a worker pool, reporting
+throughput and the linting process's peak memory.
+
+Usage:
+python benchmarks/lint_bank.py [--questions N] [--jobs N]
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bank_lint import lint  # noqa: E402
+
+
+def write_bank(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{\n  "key": null,\n  "questions": {\n')
+        for i in range(count):
+            entry = {
+                "question": f"Question {i}: which keyword defines a function in Python?",
+                "answers": {"A": "def", "B": "fun", "C": "function", "D": "lambda"},
+                "correct": "E" if i % 1000 == 999 else "A",
+                "category": "python",
+            }
+            f.write(f'    "{i + 1}": {json.dumps(entry)}{"," if i + 1 < count else ""}\n')
+        f.write("  }\n}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the streaming bank linter.")
+    parser.add_argument("--questions", type=int, default=500_000)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "bank.json")
+        write_bank(path, args.questions)
+        size = os.path.getsize(path) / 1e6
+        print(f"{args.questions} questions, {size:.1f} MB")
+
+        for jobs in dict.fromkeys((1, args.jobs)):
+            start = time.perf_counter()
+            checked, problems = lint(path, jobs=jobs, out=io.StringIO())
+            elapsed = time.perf_counter() - start
+            print(f"jobs={jobs:<3} {elapsed:6.2f} s  {size / elapsed:6.1f} MB/s  {checked} checked, {problems} problems")
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"peak RSS of the linting process: {peak:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Quiz server load test
+
+Starts `server.QuizServer` in-process (or targets a running one) and plays full
+games with thousands of concurrent simulated clients over keep-alive HTTP, or
+over WebSocket with --websocket. Reports completed sessions per second and the
+answer round-trip latency percentiles.
+
+Usage:
+python benchmarks/load_serve.py [--clients N] [--games G] [--websocket] [--url http://HOST:PORT]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import secrets
+import sys
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from instrument import Histogram  # noqa: E402
+from server import QuizServer, encode_frame, load_bank, read_frame  # noqa: E402
+
+
+CHOICES = ("A", "B", "C", "D")
+
+
+async def http_request(reader, writer, path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: quiz\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    return json.loads(await reader.readexactly(length))
+
+
+async def http_client(host, port, games, latencies, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    completed = 0
+    try:
+        for _ in range(games):
+            message = await http_request(reader, writer, "/api/sessions", {})
+            session_id = message["session"]
+            while True:
+                start = time.perf_counter()
+                message = await http_request(reader, writer, f"/api/sessions/{session_id}/answer", {"choice": rng.choice(CHOICES)})
+                latencies.record(time.perf_counter() - start)
+                if message["next"]["type"] == "finished":
+                    completed += 1
+                    break
+    finally:
+        writer.close()
+    return completed
+
+
+async def websocket_client(host, port, games, latencies, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(secrets.token_bytes(16)).decode("ascii")
+    writer.write(f"GET /ws HTTP/1.1\r\nHost: quiz\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode("latin-1"))
+    await reader.readuntil(b"\r\n\r\n")
+
+    async def send(message):
+        writer.write(encode_frame(json.dumps(message).encode("utf-8"), mask=True))
+        _, payload = await read_frame(reader)
+        return json.loads(payload)
+
+    completed = 0
+    try:
+        for _ in range(games):
+            await send({"type": "start"})
+            while True:
+                start = time.perf_counter()
+                await send({"type": "answer", "choice": rng.choice(CHOICES)})
+                _, payload = await read_frame(reader)
+                latencies.record(time.perf_counter() - start)
+                if json.loads(payload)["type"] == "finished":
+                    completed += 1
+                    break
+    finally:
+        writer.close()
+    return completed
+
+
+async def run(args):
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port
+    else:
+        server = QuizServer(load_bank())
+        host, port = "127.0.0.1", await server.start("127.0.0.1", 0)
+
+    client = websocket_client if args.websocket else http_client
+    latencies = Histogram()
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    completed = await asyncio.gather(*(client(host, port, args.games, latencies, random.Random(rng.random())) for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    if server:
+        await server.stop()
+
+    summary = latencies.summary()
+    print(f"transport           {'websocket' if args.websocket else 'http'}")
+    print(f"clients             {args.clients}")
+    print(f"sessions completed  {sum(completed)}")
+    print(f"answers             {summary['count']}")
+    print(f"seconds             {elapsed:.2f}")
+    print(f"sessions/second     {sum(completed) / elapsed:.0f}")
+    print(f"answer p50 (ms)     {summary['p50_us'] / 1000:.2f}")
+    print(f"answer p99 (ms)     {summary['p99_us'] / 1000:.2f}")
+    print(f"answer max (ms)     {summary['max_us'] / 1000:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the quiz server.")
+    parser.add_argument("--clients", type=int, default=2000, help="concurrent simulated players")
+    parser.add_argument("--games", type=int, default=3, help="games played by each client")
+    parser.add_argument("--websocket", action="store_true", help="play over WebSocket instead of HTTP")
+    parser.add_argument("--url", help="target a running server instead of starting one in-process")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Near-duplicate scan benchmark
+
+Writes a synthetic bank of random questions in which one question in a hundred
+is a reworded copy of an earlier one, then scans it cold (hashing everything)
+and warm (signatures from the cache), and reports how many copies were found.
+
+Usage:
+python benchmarks/near_duplicates_bench.py [--questions N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from near_duplicates import NearDuplicateIndex, SignatureCache, scan  # noqa: E402
+
+
+def sentence(rng, length):
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+_vocabulary = random.Random(1)
+WORDS = ["".join(_vocabulary.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(_vocabulary.randint(3, 9))) for _ in range(5000)]
+
+
+def write_bank(path, count, rng):
+    copies = set()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"questions": {\n')
+        earlier = []
+        for i in range(count):
+            if earlier and i % 100 == 99:
+                source_index, entry = rng.choice(earlier)
+                words = entry["question"].split()
+                words[rng.randrange(len(words))] = rng.choice(WORDS)
+                entry = dict(entry, question="Which of these: " + " ".join(words))
+                copies.add((f"{path}:{i}", f"{path}:{source_index}"))
+            else:
+                entry = {
+                    "question": f"What is {sentence(rng, 8)}?",
+                    "answers": {label: sentence(rng, 5) for label in "ABCD"},
+                    "correct": "A",
+                }
+                if len(earlier) < 10_000:
+                    earlier.append((i, entry))
+            f.write(f'"{i}": {json.dumps(entry)}{"," if i + 1 < count else ""}\n')
+        f.write("}}\n")
+    return copies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the near-duplicate index.")
+    parser.add_argument("--questions", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        bank = os.path.join(scratch, "bank.json")
+        cache_path = os.path.join(scratch, "signatures.bin")
+        copies = write_bank(bank, args.questions, random.Random(0))
+
+        for run in ("cold", "warm"):
+            cache = SignatureCache(cache_path)
+            start = time.perf_counter()
+            found = {(name, other) for name, other, _ in scan([bank], NearDuplicateIndex(), cache)}
+            hashed = cache.save()
+            elapsed = time.perf_counter() - start
+            print(f"{run}: {elapsed:6.2f} s, {hashed} hashed, {len(found & copies)}/{len(copies)} copies found, {len(found - copies)} other pairs")
+        print(f"cache size: {os.path.getsize(cache_path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Quiz engine throughput benchmark
+
+Replays simulated answer sequences through `quiz.QuizSession` without a display
+and reports sessions per second and per-answer latency, so the engine's speed can
+be tracked across releases.
+
+Usage:
+python benchmarks/quiz_throughput.py [--sessions N] [--accuracy P] [--seed S] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from question_store import DEFAULT_PACK, DEFAULT_SOURCE, QuestionStore  # noqa: E402
+from quiz import QuizSession  # noqa: E402
+
+
+def make_sequences(questions, count, accuracy, rng):
+    """
+    Builds `count` answer sequences where each answer is correct with probability `accuracy`.
+    """
+
+    sequences = []
+    for _ in range(count):
+        sequence = []
+        for question in questions:
+            if rng.random() < accuracy:
+                sequence.append(question["correct"])
+            else:
+                sequence.append(rng.choice([key for key in question["answers"] if key != question["correct"]]))
+        sequences.append(tuple(sequence))
+    return sequences
+
+
+def replay(questions, sequences, sessions):
+    """
+    Plays `sessions` full games, cycling through `sequences`. Returns the number of games won.
+    """
+
+    session = QuizSession(questions)
+    won = 0
+    for i in range(sessions):
+        session.reset()
+        for choice in sequences[i % len(sequences)]:
+            session.answer(choice)
+        won += session.passed
+    return won
+
+
+def answer_latencies(questions, sequences, sessions):
+    """
+    Times every answer of `sessions` games individually, in nanoseconds.
+    """
+
+    session = QuizSession(questions)
+    clock = time.perf_counter_ns
+    samples = []
+    for i in range(sessions):
+        session.reset()
+        for choice in sequences[i % len(sequences)]:
+            start = clock()
+            session.answer(choice)
+            samples.append(clock() - start)
+    samples.sort()
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure QuizSession throughput.")
+    parser.add_argument("--sessions", type=int, default=1_000_000, help="games to replay")
+    parser.add_argument("--accuracy", type=float, default=0.85, help="probability that a simulated answer is correct")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the results as one JSON object")
+    args = parser.parse_args(argv)
+
+    store = QuestionStore(DEFAULT_PACK, source=DEFAULT_SOURCE)
+    # Decode the bank once so the benchmark measures the engine, not the pack
+    questions = [store[i] for i in range(len(store))]
+    sequences = make_sequences(questions, 4096, args.accuracy, random.Random(args.seed))
+
+    start = time.perf_counter()
+    won = replay(questions, sequences, args.sessions)
+    elapsed = time.perf_counter() - start
+
+    samples = answer_latencies(questions, sequences, min(args.sessions, 50_000))
+    results = {
+        "sessions": args.sessions,
+        "answers": args.sessions * len(questions),
+        "won": won,
+        "seconds": round(elapsed, 3),
+        "sessions_per_second": round(args.sessions / elapsed),
+        "answers_per_second": round(args.sessions * len(questions) / elapsed),
+        "answer_ns_p50": samples[len(samples) // 2],
+        "answer_ns_p99": samples[int(len(samples) * 0.99)],
+        "answer_ns_max": samples[-1],
+    }
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for name, value in results.items():
+            print(f"{name:<20} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Redraw latency benchmark
+
+Measures question-to-question redraw latency of `RadioButtonFrame.update_options`,
+comparing the pooled implementation against the previous destroy/recreate one.
+Each sample updates the options to the next question and waits for Tk to finish
+its idle tasks, which is when the new options are drawn.
+
+Usage:
+python benchmarks/redraw_latency.py [--rounds N]
+
+Note:
+Needs a display (or Xvfb) since real widgets are created.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import customtkinter as ctk  # noqa: E402
+
+from main import RadioButtonFrame  # noqa: E402
+from pack_library import DEFAULT_LANGUAGE, DEFAULT_TOPIC, PackLibrary  # noqa: E402
+
+questions = PackLibrary().get(DEFAULT_LANGUAGE, DEFAULT_TOPIC)
+
+
+class RecreatingRadioButtonFrame(RadioButtonFrame):
+    """
+    The original update_options: destroys every button and builds new ones, each with its own font.
+    """
+
+    def update_options(self, options):
+        for button in self.buttons:
+            button.destroy()
+        self.buttons = []
+        for i, value in enumerate(options):
+            radiobutton = ctk.CTkRadioButton(self, text=options[value], variable=self.variable, value=value, height=50, font=ctk.CTkFont(size=18))
+            radiobutton.grid(row=i, column=0, padx=10, pady=(10, 0), sticky="ew")
+            self.set("")
+            self.buttons.append(radiobutton)
+
+
+def measure(root, frame_class, rounds):
+    frame = frame_class(root, questions[0]["answers"])
+    frame.grid(row=0, column=0, sticky="nsew")
+    root.update()
+
+    samples = []
+    for i in range(rounds):
+        answers = questions[i % len(questions)]["answers"]
+        start = time.perf_counter()
+        frame.update_options(answers)
+        root.update_idletasks()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    frame.destroy()
+    root.update()
+    return samples
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:<12} mean {statistics.mean(samples):7.3f} ms   p50 {statistics.median(samples):7.3f} ms   p95 {p95:7.3f} ms   max {samples[-1]:7.3f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare pooled and recreating option redraw latency.")
+    parser.add_argument("--rounds", type=int, default=500, help="question changes to time per implementation")
+    args = parser.parse_args(argv)
+
+    root = ctk.CTk()
+    root.geometry("600x600")
+    root.grid_rowconfigure(0, weight=1)
+    root.grid_columnconfigure(0, weight=1)
+
+    report("recreate", measure(root, RecreatingRadioButtonFrame, args.rounds))
+    report("pooled", measure(root, RadioButtonFrame, args.rounds))
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Session recording and replay benchmark
+
+Measures what recording adds to each answer, then writes synthetic recordings of
+players taking 3-15 seconds per answer and replays them across a process pool,
+reporting replay throughput and the speed-up over real time.
+
+Usage:
+python benchmarks/replay_sessions.py [--recordings N] [--sessions S] [--jobs N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from question_store import DEFAULT_PACK, DEFAULT_SOURCE, QuestionStore, ensure_pack  # noqa: E402
+from quiz import QuizSession  # noqa: E402
+from recording import ANSWER, EVENT, HEADER, SessionRecorder, replay  # noqa: E402
+
+
+def recorder_overhead(questions, answers=200_000):
+    recorder = SessionRecorder(directory=tempfile.gettempdir())
+    question = questions[0]
+    start = time.perf_counter()
+    for i in range(answers):
+        recorder.answer(i % len(questions), question, "B", False)
+    return (time.perf_counter() - start) / answers
+
+
+def write_recording(path, questions, sessions, rng):
+    recorder = SessionRecorder(directory=os.path.dirname(path))
+    recorder.path = path
+    clock = 0
+    for _ in range(sessions):
+        session = QuizSession(questions)
+        recorder.start(session.total)
+        recorder.frame("trivia")
+        while not session.finished:
+            position, question = session.position, session.current()
+            recorder.question(position, questions.digest(position))
+            choice = rng.choice(list(question["answers"]))
+            correct = session.answer(choice, question=question)
+            recorder.answer(position, question, choice, correct)
+        recorder.end(session.score, session.passed)
+
+    # Spread the events over realistic answer times
+    with open(path, "r+b") as f:
+        data = bytearray(f.read())
+        for start in range(HEADER.size, len(data), EVENT.size):
+            kind, argument, _, position, value = EVENT.unpack_from(data, start)
+            clock += rng.randint(3000, 15000) if kind == ANSWER else 0
+            EVENT.pack_into(data, start, kind, argument, clock, position, value)
+        f.seek(0)
+        f.write(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark session recording and replay.")
+    parser.add_argument("--recordings", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=50, help="sessions per recording")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    ensure_pack(DEFAULT_SOURCE, DEFAULT_PACK)
+    questions = QuestionStore(DEFAULT_PACK)
+    print(f"recording overhead per answer: {recorder_overhead(questions) * 1e6:.2f} us")
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as scratch:
+        paths = [os.path.join(scratch, f"{i}.nsqr") for i in range(args.recordings)]
+        for path in paths:
+            write_recording(path, questions, args.sessions, rng)
+        print(f"{args.recordings} recordings of {args.sessions} sessions, {sum(map(os.path.getsize, paths)) / 1e6:.1f} MB")
+
+        for jobs in dict.fromkeys((1, args.jobs)):
+            start = time.perf_counter()
+            results = []
+            for path, file_results, error in replay(paths, DEFAULT_PACK, jobs):
+                if error:
+                    sys.exit(f"{path}: {error}")
+                results.extend(file_results)
+            elapsed = time.perf_counter() - start
+            answers = sum(result["answers"] for result in results)
+            recorded = sum(result["recorded_seconds"] for result in results)
+            mismatched = sum(1 for result in results if result["mismatches"])
+            print(f"jobs={jobs:<3} {elapsed:6.2f} s  {answers / elapsed:9.0f} answers/s  {recorded / elapsed:9.0f}x real time  {mismatched} mismatched")
+
+
+if __name__ == "__main__":
+    main()
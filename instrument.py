@@ -0,0 +1,239 @@
+"""
+Instrumentation
+
+Opt-in latency measurement for the Tk UI. `install` wraps UI callbacks such as
+`TriviaFrame.next_callback` and `App.show_frame` so that every call records
+- how long the callback itself ran, and
+- how long it took until Tk was idle again, i.e. until the result was drawn.
+
+Timings go into fixed-size, HDR-style log-linear histograms (about 3% precision
+from 1 microsecond to hours). A summary is printed when the program exits and
+exporters, such as `json_file_exporter`, receive the full histograms.
+
+Nothing is wrapped unless `install` is called, so there is no overhead at all
+when instrumentation is off.
+
+Classes:
+- Histogram: Log-linear latency histogram in microseconds.
+- Recorder: Named histograms, callback wrapping and reporting.
+
+Functions:
+- install: Wraps callbacks and reports on exit.
+- json_file_exporter: Exporter writing the histograms to a JSON file.
+"""
+import atexit
+import functools
+import json
+import sys
+import time
+import tkinter
+from array import array
+
+
+# Values below 2 ** _SUB_BITS are counted exactly; above, each power of two is
+# split into 2 ** (_SUB_BITS - 1) linear buckets.
+_SUB_BITS = 6
+_SUB_COUNT = 1 << _SUB_BITS
+_HALF = _SUB_COUNT >> 1
+_MAX_SHIFT = 40
+
+
+class Histogram:
+    """
+    Latency histogram with log-linear buckets and constant memory.
+    Values are recorded in seconds and stored as whole microseconds.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = array("Q", [0]) * (_SUB_COUNT + _MAX_SHIFT * _HALF)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def _index(value):
+        if value < _SUB_COUNT:
+            return value
+        shift = min(value.bit_length() - _SUB_BITS, _MAX_SHIFT)
+        mantissa = min(value >> shift, _SUB_COUNT - 1)
+        return _SUB_COUNT + (shift - 1) * _HALF + (mantissa - _HALF)
+
+    @staticmethod
+    def _lowest(index):
+        if index < _SUB_COUNT:
+            return index
+        shift, mantissa = divmod(index - _SUB_COUNT, _HALF)
+        return (mantissa + _HALF) << (shift + 1)
+
+    def record(self, seconds):
+        """
+        Adds one measurement.
+        Args:
+            seconds (float): The measured duration.
+        """
+
+        value = max(int(seconds * 1_000_000), 0)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def percentile(self, percent):
+        """
+        Estimates a percentile.
+        Args:
+            percent (float): Between 0 and 100.
+        Returns:
+            int: The lower bound, in microseconds, of the bucket holding the percentile.
+        """
+
+        if not self.count:
+            return 0
+        rank = max(1, round(self.count * percent / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(max(self._lowest(index), self.min), self.max)
+        return self.max
+
+    def summary(self):
+        """
+        Returns:
+            dict: Count, mean, min, p50, p90, p99 and max, in microseconds.
+        """
+
+        return {
+            "count": self.count,
+            "mean_us": round(self.total / self.count, 1) if self.count else 0,
+            "min_us": self.min or 0,
+            "p50_us": self.percentile(50),
+            "p90_us": self.percentile(90),
+            "p99_us": self.percentile(99),
+            "max_us": self.max,
+        }
+
+    def buckets(self):
+        """
+        Returns:
+            list: (bucket lower bound in microseconds, count) for every non-empty bucket.
+        """
+
+        return [(self._lowest(index), count) for index, count in enumerate(self.counts) if count]
+
+
+class Recorder:
+    """
+    A set of named histograms plus the exporters that receive them.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.exporters = []
+
+    def histogram(self, name):
+        """
+        Returns the histogram called `name`, creating it if needed.
+        """
+
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def wrap(self, owner, name, render=True):
+        """
+        Replaces the method `name` of class `owner` with a timed version.
+        Args:
+            owner (type): The class, e.g. TriviaFrame.
+            name (str): The method name, e.g. "next_callback".
+            render (bool, optional): Also record the time until Tk is idle again.
+                The instance must be a Tk widget.
+        """
+
+        original = getattr(owner, name)
+        calls = self.histogram(f"{owner.__name__}.{name}")
+        rendered = self.histogram(f"{owner.__name__}.{name} to idle")
+        clock = time.perf_counter
+
+        @functools.wraps(original)
+        def timed(widget, *args, **kwargs):
+            start = clock()
+            try:
+                return original(widget, *args, **kwargs)
+            finally:
+                calls.record(clock() - start)
+                if render:
+                    try:
+                        # Idle callbacks run after the redraws the call queued
+                        widget.after_idle(lambda: rendered.record(clock() - start))
+                    except tkinter.TclError:
+                        pass
+
+        setattr(owner, name, timed)
+
+    def report(self, file=sys.stderr):
+        """
+        Prints a one-line summary per histogram.
+        Args:
+            file (optional): Stream to print to. Defaults to stderr.
+        """
+
+        if not self.histograms:
+            return
+        print(f"{'latency (us)':<40}{'count':>8}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}", file=file)
+        for name, histogram in sorted(self.histograms.items()):
+            summary = histogram.summary()
+            print(f"{name:<40}{summary['count']:>8}{summary['mean_us']:>10}{summary['p50_us']:>10}{summary['p90_us']:>10}{summary['p99_us']:>10}{summary['max_us']:>10}", file=file)
+
+    def export(self):
+        """
+        Passes the histograms to every registered exporter.
+        """
+
+        for exporter in self.exporters:
+            exporter(self.histograms)
+
+
+def json_file_exporter(path):
+    """
+    Builds an exporter that writes every histogram's summary and buckets to a JSON file.
+    Args:
+        path (str): The file to write.
+    Returns:
+        callable: The exporter.
+    """
+
+    def export(histograms):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({name: {**histogram.summary(), "buckets": histogram.buckets()} for name, histogram in histograms.items()}, f, indent=4)
+
+    return export
+
+
+def install(targets, export_path=None):
+    """
+    Starts instrumenting the given callbacks and reports when the program exits.
+    Args:
+        targets (iterable): (class, method name) pairs to time.
+        export_path (str, optional): JSON file the histograms are exported to on exit.
+    Returns:
+        Recorder: The recorder collecting the timings.
+    """
+
+    recorder = Recorder()
+    for owner, name in targets:
+        recorder.wrap(owner, name)
+    if export_path:
+        recorder.exporters.append(json_file_exporter(export_path))
+
+    def finish():
+        recorder.report()
+        recorder.export()
+
+    atexit.register(finish)
+    return recorder
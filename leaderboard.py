@@ -0,0 +1,224 @@
+"""
+Leaderboard
+
+Persistent high scores for Programmer's Squid Game.
+
+Scores are appended to a log of fixed-size, checksummed binary records, so
+recording a score is one small append and never rewrites the file. A record cut
+short by a crash is dropped when the log is next opened, and records failing
+their checksum are skipped.
+
+Top-k heaps for all time and for each day are kept in memory. They are saved
+to a snapshot together with the log offset they cover. Opening the leaderboard
+loads the snapshot and replays only the log written after it, so startup and
+queries stay fast with millions of recorded games.
+
+Classes:
+- Leaderboard: Records scores and answers top-k queries.
+
+Usage:
+python leaderboard.py [--day YYYY-MM-DD | --today] [-k N]
+"""
+import argparse
+import functools
+import heapq
+import json
+import os
+import struct
+import time
+import zlib
+
+
+# timestamp, score, total, player name (UTF-8, zero padded), CRC-32 of the preceding fields
+RECORD = struct.Struct("<dHH16sI")
+TOP_K = 100
+SNAPSHOT_EVERY = 1000
+
+
+@functools.lru_cache(maxsize=4096)
+def _quarter_hour_day(quarter):
+    return time.strftime("%Y-%m-%d", time.localtime(quarter * 900))
+
+
+def _day(timestamp):
+    # Every UTC offset is a whole number of quarter hours, so all timestamps in
+    # a quarter hour fall on the same local day and can share one lookup
+    return _quarter_hour_day(int(timestamp // 900))
+
+
+class Leaderboard:
+    """
+    Append-only score log with incrementally maintained top-k indexes.
+    """
+
+    def __init__(self, path, snapshot_path=None, k=TOP_K, durable=True):
+        """
+        Args:
+            path (str): The score log.
+            snapshot_path (str, optional): Where the index snapshot is kept. Defaults to PATH.snapshot.
+            k (int, optional): Entries kept per leaderboard; queries can ask for at most this many.
+            durable (bool, optional): fsync every append so a recorded score survives a crash.
+        """
+
+        self.path = path
+        self.snapshot_path = snapshot_path or f"{path}.snapshot"
+        self.k = k
+        self.durable = durable
+        self._all_time = []
+        self._days = {}
+        self._offset = 0
+        self._fd = None
+        self._unsnapshotted = 0
+
+    def open(self):
+        """
+        Opens the log and brings the index up to date. Done on first use otherwise;
+        this can take seconds when the snapshot is missing or stale.
+        """
+
+        self._open()
+
+    def _open(self):
+        if self._fd is not None:
+            return
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+
+        # Drop a record cut short by a crash so later appends stay aligned
+        size = os.fstat(self._fd).st_size
+        if size % RECORD.size:
+            size -= size % RECORD.size
+            os.ftruncate(self._fd, size)
+
+        self._load_snapshot(size)
+        self._replay(size)
+
+    def _load_snapshot(self, size):
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if snapshot.get("k") != self.k or snapshot.get("offset", 0) > size:
+            # Written for another log or another k: rebuild from the log instead
+            return
+        self._offset = snapshot["offset"]
+        self._all_time = [tuple(entry) for entry in snapshot["all_time"]]
+        self._days = {day: [tuple(entry) for entry in entries] for day, entries in snapshot["days"].items()}
+
+    def _replay(self, size):
+        chunk_records = 65536
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            while self._offset < size:
+                chunk = f.read(min(chunk_records * RECORD.size, size - self._offset))
+                if not chunk:
+                    break
+                view = memoryview(chunk)
+                for start in range(0, len(chunk), RECORD.size):
+                    timestamp, score, total, name, crc = RECORD.unpack_from(chunk, start)
+                    if zlib.crc32(view[start:start + RECORD.size - 4]) == crc:
+                        self._index(timestamp, score, total, name.rstrip(b"\0").decode("utf-8", errors="replace"))
+                self._offset += len(chunk)
+
+    def _push(self, heap, entry):
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def _index(self, timestamp, score, total, name):
+        # Higher scores rank first; on a tie, the earlier game does
+        entry = (score, -timestamp, name, total)
+        self._push(self._all_time, entry)
+        self._push(self._days.setdefault(_day(timestamp), []), entry)
+
+    def record(self, score, total, name="player", timestamp=None):
+        """
+        Appends a finished game's score.
+        Args:
+            score (int): Points scored.
+            total (int): Number of questions in the game.
+            name (str, optional): Player name; only the first 16 UTF-8 bytes are kept.
+            timestamp (float, optional): When the game ended. Defaults to now.
+        """
+
+        self._open()
+        timestamp = time.time() if timestamp is None else timestamp
+        encoded = name.encode("utf-8")[:16].decode("utf-8", errors="ignore").encode("utf-8")
+        body = RECORD.pack(timestamp, score, total, encoded, 0)[:-4]
+        os.write(self._fd, body + struct.pack("<I", zlib.crc32(body)))
+        if self.durable:
+            os.fsync(self._fd)
+
+        self._offset += RECORD.size
+        self._index(timestamp, score, total, encoded.decode("utf-8"))
+        self._unsnapshotted += 1
+        if self._unsnapshotted >= SNAPSHOT_EVERY:
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        """
+        Saves the indexes and the log offset they cover, atomically.
+        """
+
+        self._open()
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"k": self.k, "offset": self._offset, "all_time": self._all_time, "days": self._days}, f)
+        os.replace(tmp_path, self.snapshot_path)
+        self._unsnapshotted = 0
+
+    def close(self):
+        """
+        Saves a snapshot if scores were recorded since the last one and closes the log.
+        """
+
+        if self._fd is None:
+            return
+        if self._unsnapshotted:
+            self.save_snapshot()
+        os.close(self._fd)
+        self._fd = None
+
+    def top(self, k=10, day=None):
+        """
+        Returns the best scores.
+        Args:
+            k (int, optional): Number of entries, at most the leaderboard's k.
+            day (str, optional): "YYYY-MM-DD" for that day's leaderboard; all time if omitted.
+        Returns:
+            list: Dicts with rank, name, score, total and time, best first.
+        """
+
+        self._open()
+        heap = self._all_time if day is None else self._days.get(day, [])
+        return [
+            {"rank": rank, "name": name, "score": score, "total": total, "time": -negative_time}
+            for rank, (score, negative_time, name, total) in enumerate(heapq.nlargest(min(k, self.k), heap), start=1)
+        ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the high-score leaderboard.")
+    parser.add_argument("log", nargs="?", default="data/leaderboard.log")
+    parser.add_argument("-k", type=int, default=10, help="number of entries to show")
+    when = parser.add_mutually_exclusive_group()
+    when.add_argument("--day", help="show one day's leaderboard (YYYY-MM-DD)")
+    when.add_argument("--today", action="store_true", help="show today's leaderboard")
+    args = parser.parse_args(argv)
+
+    board = Leaderboard(args.log)
+    day = _day(time.time()) if args.today else args.day
+    entries = board.top(args.k, day=day)
+    board.close()
+
+    print(f"Leaderboard ({day or 'all time'})")
+    for entry in entries:
+        played = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["time"]))
+        print(f"{entry['rank']:>4}. {entry['name']:<16} {entry['score']:>3}/{entry['total']:<3} {played}")
+    if not entries:
+        print("No scores recorded yet.")
+
+
+if __name__ == "__main__":
+    main()
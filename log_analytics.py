@@ -0,0 +1,274 @@
+"""
+Log Analytics
+
+Turns the game log (data/squidgamelog.log) into session metrics: number of
+sessions, time per session, time spent on the trivia screen and game outcomes.
+
+The log is streamed line by line and the byte offset reached is saved in a
+checkpoint together with the running totals, so a re-run only reads the lines
+appended since the previous run. When log_pipeline has rotated the log since,
+the rotated files are found by inode and finished before the new log is read. Memory use does not depend on the log size:
+only totals and the sessions still open are kept.
+
+Both log formats written by log_pipeline are understood: the text format
+("2025-02-09 03:04 - INFO - Starting Application...") and JSON lines. Text lines
+only carry minutes, so durations from text logs have minute resolution.
+
+Usage:
+python log_analytics.py [LOG] [--checkpoint PATH] [--reset] [--json]
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+
+START_MESSAGE = "Starting Application..."
+CLOSE_MESSAGE = "Closing Application"
+FRAME_PREFIX = "Changing frame to "
+TRIVIA_FRAME = ".!triviaframe"
+OUTCOMES = {
+    "You won the game. Congratulations!": "won",
+    "You failed the game.": "failed",
+    "Your files will stay encrypted": "failed",
+}
+
+
+def parse_line(line):
+    """
+    Parses one log line.
+    Args:
+        line (str): A text or JSON log line.
+    Returns:
+        tuple or None: (timestamp in seconds, session ID or None, message), or None
+        for lines that are not log records, such as traceback continuations.
+    """
+
+    if line.startswith("{"):
+        try:
+            entry = json.loads(line)
+            timestamp = datetime.strptime(entry["time"], "%Y-%m-%dT%H:%M:%S").timestamp()
+            return timestamp, entry.get("session"), entry["message"]
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    parts = line.split(" - ", 2)
+    if len(parts) != 3:
+        return None
+    try:
+        timestamp = datetime.strptime(parts[0], "%Y-%m-%d %H:%M").timestamp()
+    except ValueError:
+        return None
+    return timestamp, None, parts[2]
+
+
+class SessionMetrics:
+    """
+    Running totals over every session seen so far, plus the sessions still open.
+    """
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.sessions = state.get("sessions", 0)
+        self.completed = state.get("completed", 0)
+        self.unterminated = state.get("unterminated", 0)
+        self.session_seconds = state.get("session_seconds", 0.0)
+        self.longest_session = state.get("longest_session", 0.0)
+        self.trivia_seconds = state.get("trivia_seconds", 0.0)
+        self.trivia_visits = state.get("trivia_visits", 0)
+        self.outcomes = state.get("outcomes", {"won": 0, "failed": 0, "abandoned": 0})
+        # session key -> [started, trivia entered or None, outcome or None]
+        self.open = state.get("open", {})
+
+    def to_state(self):
+        return dict(vars(self))
+
+    def _close(self, key, timestamp):
+        started, trivia_since, outcome = self.open.pop(key)
+        if trivia_since is not None:
+            self.trivia_seconds += timestamp - trivia_since
+        duration = timestamp - started
+        self.completed += 1
+        self.session_seconds += duration
+        self.longest_session = max(self.longest_session, duration)
+        self.outcomes[outcome or "abandoned"] += 1
+
+    def feed(self, timestamp, session, message):
+        """
+        Updates the metrics with one parsed log record.
+        Args:
+            timestamp (float): Time of the record, in seconds.
+            session (str or None): Session ID, None for text logs.
+            message (str): The log message.
+        """
+
+        key = session or ""
+        if message == START_MESSAGE:
+            if key in self.open:
+                # The previous run never logged its close, e.g. it crashed
+                self.open.pop(key)
+                self.unterminated += 1
+            self.sessions += 1
+            self.open[key] = [timestamp, None, None]
+            return
+
+        current = self.open.get(key)
+        if current is None:
+            return
+        if message == CLOSE_MESSAGE:
+            self._close(key, timestamp)
+        elif message.startswith(FRAME_PREFIX):
+            if current[1] is not None:
+                self.trivia_seconds += timestamp - current[1]
+                current[1] = None
+            if message[len(FRAME_PREFIX):].startswith(TRIVIA_FRAME):
+                self.trivia_visits += 1
+                current[1] = timestamp
+        elif current[2] is None:
+            for prefix, outcome in OUTCOMES.items():
+                if message.startswith(prefix):
+                    current[2] = outcome
+                    break
+
+    def summary(self):
+        """
+        Returns:
+            dict: The metrics, with averages in seconds.
+        """
+
+        return {
+            "sessions": self.sessions,
+            "completed_sessions": self.completed,
+            "unterminated_sessions": self.unterminated,
+            "open_sessions": len(self.open),
+            "average_session_seconds": round(self.session_seconds / self.completed, 1) if self.completed else 0.0,
+            "longest_session_seconds": round(self.longest_session, 1),
+            "trivia_visits": self.trivia_visits,
+            "total_trivia_seconds": round(self.trivia_seconds, 1),
+            "average_trivia_seconds": round(self.trivia_seconds / self.completed, 1) if self.completed else 0.0,
+            "outcomes": dict(self.outcomes),
+        }
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def rotated_logs(log_path):
+    """
+    Lists the files the log was rotated into (LOG.<date>[.<n>], as written by
+    log_pipeline), oldest first.
+    """
+
+    directory, base = os.path.split(log_path)
+    try:
+        names = os.listdir(directory or ".")
+    except FileNotFoundError:
+        return []
+    paths = [
+        os.path.join(directory, name) for name in names
+        if name.startswith(f"{base}.") and name[len(base) + 1:][:1].isdigit()
+    ]
+    return sorted(paths, key=lambda path: (os.path.getmtime(path), path))
+
+
+def _read(path, offset, metrics):
+    # Feeds the complete lines after `offset` to `metrics` and returns the offset reached
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            # A line without its newline is still being written; pick it up next run
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+            record = parse_line(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+            if record:
+                metrics.feed(*record)
+    return offset
+
+
+def process(log_path, checkpoint_path):
+    """
+    Reads the lines appended to the log since the checkpoint and updates it.
+    If the log was rotated since, the rest of the file the checkpoint points into
+    and any files rotated after it are read first, then the new log from the start.
+    Without a checkpoint, every rotated file is read before the log.
+    A truncated log, or one whose rotated file is gone, is read again from the
+    start, keeping the totals.
+    Args:
+        log_path (str): The game log.
+        checkpoint_path (str): Where the offset and totals are kept between runs.
+    Returns:
+        tuple: (SessionMetrics, number of bytes read in this run).
+    """
+
+    checkpoint = load_checkpoint(checkpoint_path)
+    metrics = SessionMetrics(checkpoint.get("metrics"))
+    stat = os.stat(log_path)
+    offset = checkpoint.get("offset", 0)
+    read = 0
+
+    if checkpoint.get("inode") != stat.st_ino:
+        rotated = rotated_logs(log_path)
+        inodes = [os.stat(path).st_ino for path in rotated]
+        first = None
+        if "inode" not in checkpoint:
+            # First run: read every rotated file the log still has
+            first, offset = 0, 0
+        elif checkpoint["inode"] in inodes:
+            # Finish the file the checkpoint points into, then the ones rotated after it
+            first = inodes.index(checkpoint["inode"])
+        if first is not None:
+            for index, path in enumerate(rotated[first:]):
+                start = offset if index == 0 else 0
+                read += _read(path, start, metrics) - start
+        offset = 0
+    elif stat.st_size < offset:
+        offset = 0
+
+    start = offset
+    offset = _read(log_path, offset, metrics)
+    read += offset - start
+
+    save_checkpoint(checkpoint_path, {"inode": stat.st_ino, "offset": offset, "metrics": metrics.to_state()})
+    return metrics, read
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise game sessions from the game log.")
+    parser.add_argument("log", nargs="?", default="data/squidgamelog.log", help="log file to read")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: LOG.analytics.json)")
+    parser.add_argument("--reset", action="store_true", help="discard the checkpoint and read the whole log, rotated files included")
+    parser.add_argument("--json", action="store_true", help="print the metrics as JSON")
+    args = parser.parse_args(argv)
+
+    checkpoint_path = args.checkpoint or f"{args.log}.analytics.json"
+    if args.reset and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    metrics, read = process(args.log, checkpoint_path)
+    summary = metrics.summary()
+    if args.json:
+        print(json.dumps(summary))
+        return
+
+    print(f"Read {read} new bytes from {args.log} and its rotated files")
+    for name, value in summary.items():
+        if name == "outcomes":
+            value = ", ".join(f"{outcome} {count}" for outcome, count in value.items())
+        print(f"{name.replace('_', ' '):<26} {value}")
+
+
+if __name__ == "__main__":
+    main()
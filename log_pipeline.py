@@ -0,0 +1,140 @@
+"""
+Log Pipeline
+
+Non-blocking logging for Programmer's Squid Game. Records are put on an in-memory
+queue by the thread that logs them (normally the Tk main thread) and written to
+disk by a background listener thread, so the event loop never waits on file I/O.
+
+The log file rotates both when it grows past a size limit and on a time schedule.
+Lines are written either in the classic text format or as JSON lines carrying a
+session ID and a monotonic timestamp.
+
+Classes:
+- SessionFilter: Stamps records with the session ID and a monotonic timestamp.
+- JsonLinesFormatter: Formats records as one JSON object per line.
+- SizedTimedRotatingFileHandler: Rotates on size as well as on time.
+
+Functions:
+- setup_logging: Installs the queue handler and starts the listener.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+import uuid
+
+
+TEXT_FORMAT = "{asctime} - {levelname} - {message}"
+TEXT_DATEFMT = "%Y-%m-%d %H:%M"
+
+
+class SessionFilter(logging.Filter):
+    """
+    Adds `session_id` and `monotonic` attributes to every record.
+    It runs where the record is created, so the timestamp is not delayed by the queue.
+    """
+
+    def __init__(self, session_id):
+        super().__init__()
+        self.session_id = session_id
+
+    def filter(self, record):
+        record.session_id = self.session_id
+        record.monotonic = time.monotonic()
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats a record as a single JSON object: wall-clock time, monotonic time,
+    session ID, level and message. Tracebacks are already part of the message
+    once the record has been through the queue handler.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "monotonic": round(getattr(record, "monotonic", record.created), 6),
+            "session": getattr(record, "session_id", None),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SizedTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """
+    A TimedRotatingFileHandler that also rolls over once the file reaches `max_bytes`.
+    Several size-triggered rollovers within one time interval get numbered suffixes
+    instead of overwriting each other.
+    """
+
+    def __init__(self, filename, max_bytes=0, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record):
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            message = f"{self.format(record)}{self.terminator}"
+            if self.stream.tell() + len(message.encode(self.encoding or "utf-8")) >= self.max_bytes:
+                return True
+        return super().shouldRollover(record)
+
+    def rotation_filename(self, default_name):
+        name = super().rotation_filename(default_name)
+        candidate, count = name, 0
+        while os.path.exists(candidate):
+            count += 1
+            candidate = f"{name}.{count}"
+        return candidate
+
+
+def setup_logging(filename, log_format="text", max_bytes=10 * 1024 * 1024, when="midnight", backup_count=7, level=logging.INFO, session_id=None):
+    """
+    Routes the root logger through a queue to a rotating file written by a background thread.
+    Args:
+        filename (str): The log file.
+        log_format (str, optional): "text" for the classic line format or "json" for JSON lines.
+        max_bytes (int, optional): Size at which the file is rotated. 0 disables size rotation.
+        when (str, optional): Time-based rotation schedule, as for TimedRotatingFileHandler.
+        backup_count (int, optional): Number of rotated files to keep.
+        level (int, optional): Root logger level.
+        session_id (str, optional): ID stamped on every record. A random one is generated if omitted.
+    Returns:
+        logging.handlers.QueueListener: The running listener. It is stopped, flushing
+        any queued records, when the interpreter exits, or earlier by calling stop().
+    """
+
+    file_handler = SizedTimedRotatingFileHandler(filename, max_bytes=max_bytes, when=when, backupCount=backup_count, encoding="utf-8", delay=True)
+    if log_format == "json":
+        file_handler.setFormatter(JsonLinesFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=TEXT_DATEFMT, style="{"))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SessionFilter(session_id or uuid.uuid4().hex[:12]))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def _stop_listener(listener):
+    # QueueListener.stop() fails if it was already stopped
+    if listener._thread is not None:
+        listener.stop()
+    for handler in listener.handlers:
+        handler.close()
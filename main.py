@@ -4,13 +4,17 @@ Programmer's Squid Game
 A Python-based trivia game inspired by "Squid Game." Players answer programming questions, and based on their score, files are either encrypted or decrypted.
 
 Features:
-- Trivia questions from a JSON file.
+- Trivia questions from memory-mapped question packs built from JSON files, one per language and topic.
 - File encryption/decryption using Fernet.
 - GUI with customtkinter.
-- Event logging.
+- Non-blocking event logging with rotation.
+- Persistent high-score leaderboard (see `python leaderboard.py`).
+- Compact recordings of every session, replayable headlessly (see `python recording.py`).
+- Per-question answer time and accuracy telemetry, ranked by `python telemetry.py`.
 
 Modules:
-- json, os, stat, sys, logging, customtkinter, cryptography.fernet, tkinter.
+- time, argparse, getpass, json, os, stat, sys, logging, collections, concurrent.futures, customtkinter, adaptive, assets, leaderboard, log_pipeline, pack_library, question_store, quiz, recording, telemetry, text_layout.
+- cryptography.fernet is only imported once files are encrypted or decrypted.
 
 Classes:
 - Attack: Handles file operations.
@@ -21,31 +25,153 @@ Classes:
 - App: Main application class.
 
 Usage:
-Run main.py to start the game. Answer trivia questions to avoid file encryption or decrypt previously encrypted files.
+Run main.py to start the game. Pass --adaptive to draw questions weighted by how hard they have proven, --startup-profile to print how long each startup phase took, and --instrument to print UI callback latencies on exit, and --no-record to stop recording sessions to data/recordings. Answer trivia questions to avoid file encryption or decrypt previously encrypted files.
+Run `main.py serve` to host the questions for many players in their browsers instead; that mode only reports scores.
 
 Note:
-Ensure the data directory contains data.json and thinking.png.
+Ensure the data directory contains data.json, thinking.png and at least the packs/en/computing.json question bank.
+More banks can be installed as data/packs/<language>/<topic>.json and are picked on the welcome screen, which "Play Again" returns to.
+Each bank's pack (<topic>.pack next to it) is rebuilt whenever it is missing or stale.
+While the game runs, `python question_store.py compile-pack SOURCE PACK` recompiles a pack and the trivia screen picks it up (POSIX only; on Windows, close the game first).
 """
+import time
+
+# Taken before any other import so --startup-profile can time the imports
+_STARTED = time.perf_counter()
+
+import argparse
+import getpass
 import json
 import os
 import stat
 import sys
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import customtkinter as ctk
 
-from cryptography.fernet import Fernet
-from tkinter import PhotoImage
+from adaptive import AdaptiveSelector
+from assets import assets
+from leaderboard import Leaderboard
+from log_pipeline import setup_logging
+from pack_library import DEFAULT_LANGUAGE, DEFAULT_TOPIC, PackLibrary
+from question_store import relocate
+from quiz import QuizSession
+from recording import SessionRecorder
+from telemetry import FLUSH_MS, ROWS as TELEMETRY_ROWS, AnswerTelemetry
+from text_layout import LayoutCache
 
 
 ########## Welcome to Programmer's Squid game ##########
 # welcome_text = pyfiglet.figlet_format(" Programmer's Squid game.")
 welcome_text = "Programmer's Squid game"
-# Load data
-with open("data/data.json", "r") as f:
-    data = json.load(f)
+# Game data is loaded by load_data() on first use
+data = None
+# Question packs are memory-mapped when selected instead of being parsed at startup
+library = PackLibrary()
+# How often the trivia screen checks for a recompiled question pack
+PACK_POLL_MS = 2000
+# How often it looks for the result while a recompiled pack is being checked
+PACK_CHECK_POLL_MS = 50
+# Recompiled packs are checked against their CRC here, off the Tk thread
+pack_checker = ThreadPoolExecutor(max_workers=1)
+# Questions per game in adaptive mode; answer statistics are kept next to each pack
+ADAPTIVE_GAME_LENGTH = 20
+# Every finished game's score. Only `score_writer` touches it: opening the log can
+# replay it and every score is fsynced, which must not hold up the Tk thread
+leaderboard = Leaderboard("data/leaderboard.log")
+score_writer = ThreadPoolExecutor(max_workers=1)
+# Wrapped question text, shared by every trivia screen
+layout_cache = LayoutCache()
+# How long the window size must stay unchanged before the question is re-wrapped
+RESIZE_DEBOUNCE_MS = 120
+
+
+def open_leaderboard():
+    # Runs on score_writer
+    try:
+        leaderboard.open()
+    except Exception:
+        logging.exception("Error opening the leaderboard")
+
+
+def check_pack(data, digests, snapshot):
+    """
+    Runs on pack_checker: checks the recompiled pack of a store and works out how its
+    questions moved, plus the adaptive statistics for it from a selector snapshot.
+    Returns:
+        tuple or None: (new pack, relocation, plan or None), or None if the pack failed its check.
+    """
+
+    candidate = data.open_replacement()
+    if candidate is None:
+        return None
+    new_digests = candidate.digests()
+    relocation = relocate(digests, new_digests)
+    plan = AdaptiveSelector.plan_resize(snapshot, len(new_digests), relocation, new_digests) if snapshot is not None else None
+    return candidate, relocation, plan
+
+
+def _close_checked_pack(check):
+    # Done callback for a pack check whose trivia screen went away before it finished
+    if check.exception() is None and check.result() is not None:
+        check.result()[0].close()
+
+
+def record_score(score, total):
+    # Runs on score_writer
+    try:
+        leaderboard.record(score, total, name=getpass.getuser())
+    except Exception:
+        logging.exception("Error recording the score on the leaderboard")
+
+
+def load_data():
+    """
+    Loads data/data.json the first time it is needed.
+    Returns:
+        dict: The game data (readme_context, folders and key), shared by every caller.
+    """
+
+    global data
+    if data is None:
+        with open("data/data.json", "r") as f:
+            data = json.load(f)
+    return data
+
+
+class StartupProfile:
+    """
+    Records how long each startup phase took, for --startup-profile.
+    """
+
+    def __init__(self, started):
+        self.started = started
+        self.phases = []
+        self._last = started
+
+    def mark(self, phase):
+        """
+        Ends the current phase and names it.
+        Args:
+            phase (str): Name of the phase that just finished.
+        """
+
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last, now - self.started))
+        self._last = now
+
+    def report(self, file=sys.stderr):
+        """
+        Prints the per-phase timing breakdown.
+        Args:
+            file (optional): Stream to print to. Defaults to stderr.
+        """
+
+        print(f"{'phase':<16}{'took (ms)':>12}{'at (ms)':>12}", file=file)
+        for phase, took, at in self.phases:
+            print(f"{phase:<16}{took * 1000:>12.1f}{at * 1000:>12.1f}", file=file)
 
-ctk.set_appearance_mode("dark")
-ctk.set_default_color_theme("green")
 
 class Attack:
     
@@ -103,6 +229,9 @@ class Attack:
             IOError: If there is an error writing to 'data.json'.
         """
 
+        from cryptography.fernet import Fernet
+
+        data = load_data()
         logging.info("Generating key...")
         self.key = Fernet.generate_key()
         logging.info(f"{self.key}")
@@ -127,6 +256,9 @@ class Attack:
                 Exception: If there is an error encrypting a file or creating a readme file.
             """
         
+        from cryptography.fernet import Fernet
+
+        data = load_data()
         # Generate a key
         self.generate_key()
 
@@ -155,7 +287,7 @@ class Attack:
                 frame.progressbar.set(progress)
                 master.update_idletasks()
             if index+1 == len(self.files):
-                frame.summary.configure(text="All done!", font=ctk.CTkFont(size=20), text_color="green")
+                frame.summary.configure(text="All done!", font=assets.font(size=20), text_color="green")
                 frame.next_button.grid(padx=20, pady=(0, 40), sticky="n")
                 frame.next_button.configure(
                     command=lambda: master.show_frame(
@@ -195,6 +327,9 @@ class Attack:
             Exception: If there is an error during file decryption or removal.
         """
 
+        from cryptography.fernet import Fernet
+
+        data = load_data()
         # Read the key file
         key = bytes(data["key"][2:-1], "utf-8")
 
@@ -220,7 +355,7 @@ class Attack:
                 frame.progressbar.set(progress)
                 master.update_idletasks()
             if index+1 == len(self.files):
-                frame.summary.configure(text="All done!", font=ctk.CTkFont(size=20), text_color="green", justify="center")
+                frame.summary.configure(text="All done!", font=assets.font(size=20), text_color="green", justify="center")
                 frame.next_button.grid(padx=20, pady=(0, 40), sticky="n")
                 frame.next_button.configure(
                     command=lambda: master.show_frame(
@@ -251,34 +386,82 @@ class WelcomeFrame(ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master,**kwargs)
 
-        self.welcome_label = ctk.CTkLabel(self, text=welcome_text, width=200, height=100, font=ctk.CTkFont("Times", 40, 'bold'), justify="center", wraplength=500)
+        self.welcome_label = ctk.CTkLabel(self, text=welcome_text, width=200, height=100, font=assets.font(40, "bold", family="Times", owner=self), justify="center", wraplength=500)
         self.welcome_label.grid(row=0, column=0, padx=40, pady=(10, 10), sticky="s")
 
-        self.continue_button = ctk.CTkButton(self, text="Continue", command=lambda: master.show_frame(self, master.trivia_screen), font=ctk.CTkFont(size=20, weight="bold"), height=60, width=160)
+        # Installed packs are only listed here; a pack is opened once it is selected
+        self.pack_picker = ctk.CTkFrame(self, fg_color="transparent")
+        self.pack_picker.grid(row=1, column=0, padx=20, pady=(0, 20), sticky="s")
+        menu_font = assets.font(size=15, owner=self)
+        self.language_menu = ctk.CTkOptionMenu(self.pack_picker, values=library.languages() or [master.language], command=self._on_language, font=menu_font, width=120)
+        self.language_menu.set(master.language)
+        self.language_menu.grid(row=0, column=0, padx=10)
+        self.topic_menu = ctk.CTkOptionMenu(self.pack_picker, values=library.topics(master.language) or [master.topic], command=self._on_topic, font=menu_font, width=160)
+        self.topic_menu.set(master.topic)
+        self.topic_menu.grid(row=0, column=1, padx=10)
+
+        self.continue_button = ctk.CTkButton(self, text="Continue", command=lambda: master.show_frame(self, master.trivia_screen), font=assets.font(size=20, weight="bold", owner=self), height=60, width=160)
         self.continue_button.grid(row=2, column=0, padx=20, pady=(0, 40), sticky="n")
 
         self.grid_rowconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
+    def _on_language(self, language):
+        topics = library.topics(language)
+        self.topic_menu.configure(values=topics)
+        if self.topic_menu.get() not in topics:
+            self.topic_menu.set(topics[0])
+        self.master.select_pack(language, self.topic_menu.get())
+
+    def _on_topic(self, topic):
+        self.master.select_pack(self.language_menu.get(), topic)
+
+    def reset_state(self):
+        """
+        Restores the frame to its initial state. The welcome screen holds no state;
+        the pack menus keep the last selection.
+        """
+
 
 class LoaderScreen(ctk.CTkFrame):
-    def __init__(self, master):
+    def __init__(self, master, notice=False):
         super().__init__(master)
+        self.notice = notice
         self.grid_rowconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
-        self.title = ctk.CTkLabel(self, font=ctk.CTkFont(size=30))
+        self.title = ctk.CTkLabel(self, font=assets.font(size=30, owner=self))
         self.title.grid(row=0)
 
         self.progressbar = ctk.CTkProgressBar(self, orientation="horizontal")
         self.progressbar.grid(row=1, padx=50, pady=(0, 0), sticky="ew")
 
-        self.summary = ctk.CTkLabel(self, font=ctk.CTkFont(size=15), wraplength=500)
+        self.summary_font = assets.font(size=15, owner=self)
+        self.summary = ctk.CTkLabel(self, font=self.summary_font, wraplength=500)
         self.summary.grid(pady=(0, 80), sticky="nsew")
+        self._summary_text_color = self.summary.cget("text_color")
+
+        self.next_button = ctk.CTkButton(self, text="Continue", font=assets.font(size=15, weight="bold", owner=self), height=50, width=150)
+
+        # A notice screen has no progress and always offers to play again
+        if self.notice:
+            self.progressbar.grid_forget()
+            self.next_button.grid(padx=20, pady=(0, 40), sticky="n")
+            self.next_button.configure(text="Play Again")
 
-        self.next_button = ctk.CTkButton(self, text="Continue", font=ctk.CTkFont(size=15, weight="bold"), height=50, width=150)
+    def reset_state(self):
+        """
+        Restores the screen to its initial state so it can be shown again.
+        Clears the progress and undoes the summary styling and the continue button
+        added by `Attack` once its work is done.
+        """
+
+        self.progressbar.set(0)
+        self.summary.configure(text="", font=self.summary_font, text_color=self._summary_text_color, justify="center")
+        if not self.notice:
+            self.next_button.grid_forget()
 
     def update_args(self, **kwargs):
         """
@@ -303,30 +486,42 @@ class RadioButtonFrame(ctk.CTkFrame):
         self.values = values
         self.variable = ctk.StringVar(value="")
         self.buttons = []
+        # One font shared by every pooled button
+        self.font = assets.font(size=18, owner=self)
 
-        for i, value in enumerate(self.values):
-            radiobutton = ctk.CTkRadioButton(self, text=self.values[value], variable=self.variable, value=value, height=50, font=ctk.CTkFont(size=18))
-            radiobutton.grid(row=i, column=0, padx=10, pady=(10, 0), sticky="ew")
-            self.buttons.append(radiobutton)
+        self.update_options(self.values)
 
+    def _make_button(self, row, text, value):
+        radiobutton = ctk.CTkRadioButton(self, text=text, variable=self.variable, value=value, height=50, font=self.font)
+        radiobutton.grid(row=row, column=0, padx=10, pady=(10, 0), sticky="ew")
+        return radiobutton
 
     def update_options(self, options):
         """
-        Updates the options displayed by destroying existing buttons and creating new radio buttons.
+        Updates the options displayed, reusing the existing radio buttons.
+        Buttons are only created or destroyed when the number of options changes;
+        otherwise each pooled button just gets its new text.
         Args:
             options (dict): A dictionary where keys are the values for the radio buttons and values are the text to be displayed on the buttons.
         Returns:
             None
         """
 
-        for button in self.buttons:
-            button.destroy()
-        self.buttons = []
+        self.values = options
+        self.set("")
         for i, value in enumerate(options):
-            radiobutton = ctk.CTkRadioButton(self, text=options[value], variable=self.variable, value=value, height=50, font=ctk.CTkFont(size=18))
-            radiobutton.grid(row=i, column=0, padx=10, pady=(10, 0), sticky="ew")
-            self.set("")
-            self.buttons.append(radiobutton)
+            if i == len(self.buttons):
+                self.buttons.append(self._make_button(i, options[value], value))
+            elif self.buttons[i].cget("value") != value:
+                # The radio value is fixed at creation, so only rebuild this row
+                self.buttons[i].destroy()
+                self.buttons[i] = self._make_button(i, options[value], value)
+            elif self.buttons[i].cget("text") != options[value]:
+                self.buttons[i].configure(text=options[value])
+
+        for button in self.buttons[len(options):]:
+            button.destroy()
+        del self.buttons[len(options):]
 
     def get(self):
         """
@@ -347,42 +542,233 @@ class RadioButtonFrame(ctk.CTkFrame):
         self.variable.set(value)
 
 class TriviaFrame(ctk.CTkFrame):
-    def __init__(self, master, data):
+    def __init__(self, master, data, selector=None, telemetry=None, recorder=None):
         super().__init__(master)
 
         self.master = master
+        self.recorder = recorder
+        self.telemetry = telemetry
 
         self.grid_rowconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
-        self.score = 0
         self._data = data
-        self._qtn_num = 1
+        # Scoring and question advancement live in the headless quiz engine
+        self.selector = selector
+        self.session = QuizSession(data, selector=selector, length=ADAPTIVE_GAME_LENGTH if selector else None)
+        self._shown_at = time.perf_counter()
 
-        self.scores = ctk.CTkLabel(self, text=f"Score: {self.score}", font=ctk.CTkFont(size=22))
+        self.scores = ctk.CTkLabel(self, text=f"Score: {self.score}", font=assets.font(size=22, owner=self))
         self.scores.grid(row=0, column=0, padx=10, pady=(10, 0), sticky="sew")
 
-        self.progress_text = ctk.CTkLabel(self, text=f"{self._qtn_num}/{len(self._data)}", font=ctk.CTkFont(size=15))
+        self.progress_text = ctk.CTkLabel(self, text=f"{self._qtn_num}/{self.session.total}", font=assets.font(size=15, owner=self))
         self.progress_text.grid(row=1, sticky="sew")
 
         self.progressbar = ctk.CTkProgressBar(self, orientation="horizontal")
         self.progressbar.grid(row= 2, column=0, padx=20, pady=(0, 20), sticky="ew")
-        progress = (self._qtn_num) / len(self._data)
+        progress = (self._qtn_num) / self.session.total
         self.progressbar.set(progress)
 
-        self.question = ctk.CTkLabel(self, text=self._data[str(self._qtn_num)]["question"], font=ctk.CTkFont(size=16), wraplength=300)
+        # The question is wrapped by the layout cache, so the label itself never wraps
+        self.question_font = assets.font(size=16, owner=self)
+        self._wrap_width = 300
+        self._resize_job = None
+        self.question = ctk.CTkLabel(self, font=self.question_font)
         self.question.grid(row=3, column=0, padx=10, pady=(10, 0), sticky="nsew")
+        self.layout_question()
 
-        self.options = RadioButtonFrame(self, self._data[str(self._qtn_num)]["answers"], height=400)
+        self.options = RadioButtonFrame(self, self.session.current()["answers"], height=400)
         self.options.grid(row=4, column=0, padx=20, pady=(10, 20), sticky="ns")
 
         self.feedback_label = ctk.CTkLabel(self, text=None, text_color="green")
         self.feedback_label.grid(row=5, column=0, sticky="new")
 
-        self.submit_btn = ctk.CTkButton(self, text="Next", command=self.next_callback, font=ctk.CTkFont(size=20, weight="bold"), height=50, width=160)
+        self.submit_btn = ctk.CTkButton(self, text="Next", command=self.next_callback, font=assets.font(size=20, weight="bold", owner=self), height=50, width=160)
         self.submit_btn.grid(row=6, column=0, padx=20, pady=(10, 20), sticky="n")
 
+        # (pack, future of its replacement) while a recompiled pack is being checked
+        self._pack_check = None
+        self._poll_job = self.after(PACK_POLL_MS, self.poll_pack)
+        self._flush_job = self.after(FLUSH_MS, self.flush_telemetry)
+        self.bind("<Configure>", self._on_resize)
+
+    @property
+    def score(self):
+        return self.session.score
+
+    def set_questions(self, data, selector=None, telemetry=None):
+        """
+        Switches to another question pack. The new game starts when the frame is next shown.
+        Args:
+            data (QuestionStore): The pack.
+            selector (AdaptiveSelector, optional): Picks the questions adaptively.
+            telemetry (AnswerTelemetry, optional): Aggregates answer times and accuracy for the pack.
+        """
+
+        self._flush_telemetry()
+        self._data = data
+        self.selector = selector
+        self.telemetry = telemetry
+        self.session = QuizSession(data, selector=selector, length=ADAPTIVE_GAME_LENGTH if selector else None)
+
+    @property
+    def _qtn_num(self):
+        return self.session.number
+
+    def reset_state(self):
+        """
+        Starts a new game on this frame: clears the score and feedback and shows the first question.
+        """
+
+        self.session.reset()
+        if self.recorder:
+            self.recorder.start(self.session.total, pack=f"{self.master.language}/{self.master.topic}")
+        self.feedback_label.configure(text="", text_color="green")
+        self.show_question()
+
+    def poll_pack(self):
+        """
+        Swaps to a recompiled question pack without restarting the game.
+        The new pack's checksum is verified by `pack_checker`, which also works out
+        where each question moved and the adaptive statistics for the new pack, so the
+        UI does not wait on any of it; the pack is swapped in here once it passes. The
+        game carries on from the same question, which is only redrawn if it was edited
+        or removed.
+        Reschedules itself every PACK_POLL_MS milliseconds, or PACK_CHECK_POLL_MS
+        while a pack is being checked.
+        """
+
+        if self._pack_check is None:
+            if self._data.changed():
+                snapshot = self.selector.snapshot() if self.selector else None
+                check = pack_checker.submit(check_pack, self._data, self._data.digests(), snapshot)
+                self._pack_check = (self._data, self.selector, check)
+        elif self._pack_check[2].done():
+            data, selector, check = self._pack_check
+            self._pack_check = None
+            try:
+                result = check.result()
+            except Exception:
+                logging.exception("Error checking the recompiled question pack")
+                result = None
+            else:
+                if result is None:
+                    logging.warning(f"Ignoring the recompiled question pack {data.path}: it is not an intact pack")
+            if result is None or data is not self._data or selector is not self.selector:
+                # Rejected, or another pack was selected meanwhile
+                if selector:
+                    selector.cancel_resize()
+                if result is not None:
+                    result[0].close()
+            else:
+                candidate, relocation, plan = result
+                position = self.session.position
+                current = data.digest(position)
+                data.adopt(candidate)
+                logging.info("Question pack reloaded")
+                if selector:
+                    selector.apply_resize(plan, relocation)
+                moved = position if relocation is None else relocation[position]
+                self.session.resize(moved if moved >= 0 else None)
+                if data.digest(self.session.position) != current:
+                    self.show_question()
+        self._poll_job = self.after(PACK_CHECK_POLL_MS if self._pack_check else PACK_POLL_MS, self.poll_pack)
+
+    def flush_telemetry(self):
+        """
+        Writes the answer telemetry gathered since the last flush in one batch.
+        Reschedules itself every FLUSH_MS milliseconds.
+        """
+
+        self._flush_telemetry()
+        self._flush_job = self.after(FLUSH_MS, self.flush_telemetry)
+
+    def _flush_telemetry(self):
+        if self.telemetry:
+            try:
+                self.telemetry.flush()
+            except Exception:
+                logging.exception("Error writing the answer telemetry")
+
+    def save_game(self):
+        """
+        Saves what a finished game changed: the adaptive statistics, the recording, the
+        answer telemetry and, on `score_writer`, the leaderboard score. Errors are logged
+        and do not keep the game from moving on to the next screen.
+        """
+
+        score_writer.submit(record_score, self.score, self.session.total)
+        if self.selector:
+            try:
+                self.selector.save()
+            except Exception:
+                logging.exception("Error saving the adaptive question statistics")
+        if self.recorder:
+            try:
+                self.recorder.end(self.score, self.session.passed)
+            except Exception:
+                logging.exception("Error writing the session recording")
+        self._flush_telemetry()
+
+    def destroy(self):
+        # Also runs when the window is closed, so no answer is lost on exit.
+        # The polling loops are cancelled so they do not keep the frame alive or fire on it once it is gone.
+        for job in (self._poll_job, self._flush_job, self._resize_job):
+            if job is not None:
+                self.after_cancel(job)
+        self._poll_job = self._flush_job = self._resize_job = None
+        if self._pack_check is not None:
+            _, selector, check = self._pack_check
+            self._pack_check = None
+            if selector:
+                selector.cancel_resize()
+            if not check.cancel():
+                check.add_done_callback(_close_checked_pack)
+        self._flush_telemetry()
+        super().destroy()
+
+    def _on_resize(self, event):
+        # Re-wrap once the size has settled rather than on every configure event.
+        # event.width is in screen pixels, but the question is measured with the unscaled
+        # font, so the width is brought back to unscaled units (as is the 10 pixel
+        # padding on each side of the label, which customtkinter scales too).
+        self._pending_width = event.width / self._get_widget_scaling() - 20
+        if self._resize_job is not None:
+            self.after_cancel(self._resize_job)
+        self._resize_job = self.after(RESIZE_DEBOUNCE_MS, self._apply_resize)
+
+    def _apply_resize(self):
+        self._resize_job = None
+        width = layout_cache.bucket_width(self._pending_width)
+        if width != self._wrap_width:
+            self._wrap_width = width
+            self.layout_question()
+
+    def layout_question(self):
+        """
+        Shows the current question wrapped to the last settled width of the frame.
+        """
+
+        lines, _ = layout_cache.wrap(self.session.current()["question"], self.question_font, self._wrap_width)
+        self.question.configure(text="\n".join(lines))
+
+    def show_question(self):
+        """
+        Displays the current question, its options, the score and the progress.
+        """
+
+        self.scores.configure(text=f"Score: {self.score}")
+        self.progress_text.configure(text=f"{self._qtn_num}/{self.session.total}")
+        self.layout_question()
+        self.options.update_options(self.session.current()["answers"])
+
+        progress = (self._qtn_num) / self.session.total
+        self.progressbar.set(progress)
+        if self.recorder:
+            self.recorder.question(self.session.position, self._data.digest(self.session.position))
+        self._shown_at = time.perf_counter()
+
     def next_callback(self):
         """
         Handles the logic for progressing to the next question in the quiz game.
@@ -391,10 +777,11 @@ class TriviaFrame(ctk.CTkFrame):
         If the quiz is completed, it checks the score and either encrypts or decrypts 
         files based on the user's performance.
         Steps:
-        1. Check if the selected answer is correct and update the score.
+        1. Let the quiz session score the selected answer and advance to the next question,
+           recording the answer if sessions are recorded and adding it to the answer telemetry.
         2. Provide feedback to the user.
-        3. Check if there are more questions to display.
-        4. If the quiz is completed:
+        3. Check if the session is finished.
+        4. If the quiz is completed, save the game (see `save_game`), then:
             - If the score is less than 18:
                 - If files are not already encrypted, encrypt them and show the encryption screen.
                 - If files are already encrypted, show a notice screen.
@@ -404,24 +791,29 @@ class TriviaFrame(ctk.CTkFrame):
         5. Update the score display, progress text, and progress bar.
         6. Load the next question and its options.
         Note:
-        - The method assumes that `self._data` contains the quiz data in a specific format.
+        - Scoring and question advancement are done by `self.session`, a `QuizSession`.
         - The method interacts with the `self.master` object to show different screens.
         - The `Attack` class is used to handle file encryption and decryption.
         Raises:
-        - KeyError: If the question number exceeds the length of the questions.
+        - RuntimeError: If called again after the quiz session is finished.
         """
 
-        if self.options.get() == self._data[str(self._qtn_num)]["correct"]:
-            self.score += 1
-            self.feedback_label.configure(text="Correct!")
+        position, question, choice = self.session.position, self.session.current(), self.options.get()
+        seconds = time.perf_counter() - self._shown_at
+        correct = self.session.answer(choice, question=question, seconds=seconds)
+        if self.recorder:
+            self.recorder.answer(position, question, choice, correct)
+        if self.telemetry:
+            self.telemetry.record(self._data.digest(position), correct, seconds)
+        if correct:
+            self.feedback_label.configure(text="Correct!", text_color="green")
         else:
             self.feedback_label.configure(text="Wrong!", text_color="red")
 
-        # check if the question number doesn't exceed the length of the questions
-        if self._qtn_num < len(self._data):
-            self._qtn_num += 1
-        else:
-            if self.score < 18:
+        if self.session.finished:
+            data = load_data()
+            self.save_game()
+            if not self.session.passed:
                 if not data["key"]:
                     logging.info("You failed the game. You will be attacked by ransomware.")
                     logging.info("Your files will be encrypted.")
@@ -463,13 +855,7 @@ class TriviaFrame(ctk.CTkFrame):
                         )
                     )
         
-        self.scores.configure(text=f"Score: {self.score}")
-        self.progress_text.configure(text=f"{self._qtn_num}/{len(self._data)}")
-        self.question.configure(text=self._data[str(self._qtn_num)]["question"], wraplength=self.winfo_width())
-        self.options.update_options(self._data[str(self._qtn_num)]["answers"])
-
-        progress = (self._qtn_num) / len(self._data)
-        self.progressbar.set(progress)
+        self.show_question()
 
         # You can add logic here to load the next question or end the quiz
         # For now, it just prints the selected answer
@@ -479,31 +865,142 @@ class TriviaFrame(ctk.CTkFrame):
 
 
 class App(ctk.CTk):
-    def __init__(self, **kwargs): 
+    def __init__(self, profile=None, adaptive=False, recorder=None, **kwargs): 
+        ctk.set_appearance_mode("dark")
+        ctk.set_default_color_theme("green")
         super().__init__()
 
+        self.profile = profile
+        self.recorder = recorder
+        self.adaptive = adaptive
+        self.language = DEFAULT_LANGUAGE
+        self.topic = DEFAULT_TOPIC
+        self._pack_state = OrderedDict()  # (language, topic) -> (QuestionStore, selector, telemetry), least recently used first
         self.title("Programmer's Squid game")
         self.geometry("600x600")
         self.grid_rowconfigure(0, weight=1)  # configure grid system
         self.grid_columnconfigure(0, weight=1)
-        icon = PhotoImage(file="data/thinking.png")
-        self.iconphoto(False, icon)
 
-        self.welcome_screen = WelcomeFrame(self)
-        self.trivia_screen = TriviaFrame(self, data["questions"])
-        self.loader_screen = LoaderScreen(self)
-
-        self.notice_screen = LoaderScreen(self)
-        self.notice_screen.progressbar.grid_forget()
-        self.notice_screen.next_button.grid(padx=20, pady=(0, 40), sticky="n")
-        self.notice_screen.next_button.configure(command=lambda: self.show_frame(self.notice_screen, self.trivia_screen))
-        self.notice_screen.next_button.configure(text="Play Again")
+        # Frames are built once, on first use, and reset whenever they are shown again
+        self._frames = {}
+        self._frame_factories = {
+            "welcome": lambda: WelcomeFrame(self),
+            "trivia": lambda: TriviaFrame(self, *self.open_pack(), recorder=recorder),
+            "loader": lambda: LoaderScreen(self),
+            "notice": self._make_notice_screen,
+        }
 
         self.show_frame(None, self.welcome_screen)
+        if self.profile:
+            self.profile.mark("first frame")
+
+        # Runs once the event loop is idle, i.e. after the welcome screen is drawn
+        self.after_idle(self.load_deferred_assets)
+
+    def load_deferred_assets(self):
+        """
+        Loads what the welcome screen does not need: the window icon and the question pack.
+        The leaderboard is opened in the background, ready for the first finished game.
+        With a startup profile, this also records the first paint and prints the report.
+        """
+
+        if self.profile:
+            self.profile.mark("first paint")
+
+        self.icon = assets.image("data/thinking.png", owner=self)
+        self.iconphoto(False, self.icon)
+        len(library.get(self.language, self.topic))  # maps the pack, rebuilding it first if it is stale
+        score_writer.submit(open_leaderboard)
+
+        if self.profile:
+            self.profile.mark("data load")
+            self.profile.report()
+
+    def open_pack(self):
+        """
+        Opens the selected question pack, through the library's cache. The adaptive selector
+        and telemetry of the most recently used packs are kept too, so switching back to a pack
+        does not reload its statistics.
+        Returns:
+            tuple: (QuestionStore, AdaptiveSelector or None, AnswerTelemetry) for the trivia screen.
+        """
+
+        key = (self.language, self.topic)
+        questions = library.get(*key)
+        state = self._pack_state.pop(key, None)
+        if state is None:
+            selector = AdaptiveSelector(len(questions), library.stats_path(*key), digests=questions.digests()) if self.adaptive else None
+            telemetry = AnswerTelemetry(library.telemetry_path(*key), min(len(questions), TELEMETRY_ROWS))
+        else:
+            store, selector, telemetry = state
+            if selector and store is not questions:
+                # The library closed and reopened the pack meanwhile, which may since have been recompiled
+                digests = questions.digests()
+                relocation = relocate(selector.digests, digests) if selector.digests is not None else None
+                if relocation is not None or len(selector) != len(questions):
+                    selector.resize(len(questions), relocation, digests)
+        self._pack_state[key] = (questions, selector, telemetry)
+        while len(self._pack_state) > library.max_open:
+            _, (_, evicted, _) = self._pack_state.popitem(last=False)
+            if evicted:
+                evicted.save()
+        return questions, selector, telemetry
+
+    def select_pack(self, language, topic):
+        """
+        Switches the game to another language and topic. The pack is opened right
+        away, or served from the library's cache if it was used recently.
+        """
+
+        if (language, topic) == (self.language, self.topic):
+            return
+        self.language, self.topic = language, topic
+        logging.info(f"Selected the {language}/{topic} question pack")
+        if "trivia" in self._frames:
+            self._frames["trivia"].set_questions(*self.open_pack())
+        else:
+            len(library.get(language, topic))
+
+    def _make_notice_screen(self):
+        notice_screen = LoaderScreen(self, notice=True)
+        # Back through the welcome screen, where another pack can be picked for the next game
+        notice_screen.next_button.configure(command=lambda: self.show_frame(notice_screen, self.welcome_screen))
+        return notice_screen
+
+    def get_frame(self, name):
+        """
+        Returns the frame registered under `name`, building it on first use.
+        Args:
+            name (str): One of "welcome", "trivia", "loader" or "notice".
+        Returns:
+            ctk.CTkFrame: The single instance of that frame.
+        """
+
+        frame = self._frames.get(name)
+        if frame is None:
+            frame = self._frames[name] = self._frame_factories[name]()
+        return frame
+
+    @property
+    def welcome_screen(self):
+        return self.get_frame("welcome")
+
+    @property
+    def trivia_screen(self):
+        return self.get_frame("trivia")
+
+    @property
+    def loader_screen(self):
+        return self.get_frame("loader")
+
+    @property
+    def notice_screen(self):
+        return self.get_frame("notice")
 
     def show_frame(self, forget_frame, frame, **kwargs):
         """
         Changes the currently displayed frame to a new frame.
+        The new frame is reset to its initial state before it is displayed.
         Parameters:
         forget_frame (tk.Frame): The frame to be hidden.
         frame (tk.Frame): The frame to be displayed.
@@ -513,10 +1010,12 @@ class App(ctk.CTk):
         """
 
         logging.info(f"Changing frame to {frame}")
+        if self.recorder:
+            self.recorder.frame(next((name for name, built in self._frames.items() if built is frame), None))
         if forget_frame:
             forget_frame.grid_forget()
 
-        self.reset()
+        frame.reset_state()
         if kwargs:
             frame.update_args(**kwargs)
         frame.grid(row=0, column=0, padx=0, pady=0, sticky="nsew")
@@ -524,36 +1023,69 @@ class App(ctk.CTk):
     
     def reset(self):
         """
-        Resets the game by initializing and configuring the various screens.
-        This method sets up the welcome screen, trivia screen with questions,
-        loader screen, and notice screen. It also configures the notice screen's
-        progress bar and next button to transition to the trivia screen when clicked.
+        Resets the game by restoring every frame built so far to its initial state.
         """
 
-        self.welcome_screen = WelcomeFrame(self)
-        self.trivia_screen = TriviaFrame(self, data["questions"])
-        self.loader_screen = LoaderScreen(self)
+        for frame in self._frames.values():
+            frame.reset_state()
+
+    def release(self):
+        """
+        Destroys every frame built so far. They are rebuilt on next use.
+        """
 
-        self.notice_screen = LoaderScreen(self)
-        self.notice_screen.progressbar.grid_forget()
-        self.notice_screen.next_button.grid(padx=20, pady=(0, 40), sticky="n")
-        self.notice_screen.next_button.configure(command=lambda: self.show_frame(self.notice_screen, self.trivia_screen))
-        self.notice_screen.next_button.configure(text="Play Again")
+        for frame in self._frames.values():
+            frame.destroy()
+        self._frames.clear()
 
 
 
 if __name__ == "__main__":
-    logging.basicConfig(
-    filename="data/squidgamelog.log",
-    encoding="utf-8",
-    filemode="a",
-    format="{asctime} - {levelname} - {message}",
-    style="{",
-    datefmt="%Y-%m-%d %H:%M",
-    level=logging.INFO
-)
+    parser = argparse.ArgumentParser(description="Programmer's Squid game")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("serve", help="host sessions for many players over HTTP/WebSocket (see server.py --help)", add_help=False)
+    parser.add_argument("--startup-profile", action="store_true", help="print a per-phase startup timing breakdown")
+    parser.add_argument("--adaptive", action="store_true", help="pick questions by past difficulty instead of in order")
+    parser.add_argument("--instrument", action="store_true", help="time UI callbacks and print latency histograms on exit")
+    parser.add_argument("--instrument-out", metavar="PATH", help="also export the latency histograms to a JSON file (implies --instrument)")
+    parser.add_argument("--no-record", action="store_true", help="do not record sessions to data/recordings")
+    parser.add_argument("--log-format", choices=["text", "json"], default="text", help="write the log as text lines or JSON lines")
+    args, extra = parser.parse_known_args()
+    if args.command == "serve":
+        import server
+
+        server.main(extra)
+        sys.exit()
+    if extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+
+    profile = None
+    if args.startup_profile:
+        profile = StartupProfile(_STARTED)
+        profile.mark("imports")
+
+    # Log records are written by a background thread so the Tk loop never waits on disk
+    setup_logging("data/squidgamelog.log", log_format=args.log_format)
+
+    if args.instrument or args.instrument_out:
+        import instrument
+
+        instrument.install(
+            [(App, "show_frame"), (TriviaFrame, "next_callback"), (RadioButtonFrame, "update_options")],
+            export_path=args.instrument_out,
+        )
 
     logging.info("Starting Application...")
-    app = App()
+    recorder = None
+    if not args.no_record:
+        recorder = SessionRecorder(adaptive=args.adaptive, length=ADAPTIVE_GAME_LENGTH if args.adaptive else None)
+    app = App(profile=profile, adaptive=args.adaptive, recorder=recorder)
     app.mainloop()
+    pack_checker.shutdown(cancel_futures=True)
+    library.close()
+    # Waits for the last score to be written
+    score_writer.shutdown()
+    leaderboard.close()
+    if recorder:
+        recorder.close()
     logging.info("Closing Application")
\ No newline at end of file
@@ -0,0 +1,389 @@
+"""
+Near Duplicates
+
+Finds reworded copies of the same question across question banks and packs.
+
+Each question is reduced to a MinHash signature of the character shingles of its
+text and of its answers, so two questions with mostly the same wording and answer
+set get mostly the same signature values. Signatures are bucketed band by band
+(locality-sensitive hashing): only questions sharing a whole band become
+candidates, and only candidates are compared, so a scan takes roughly linear time
+instead of comparing every pair.
+
+Signatures use one-permutation hashing: every shingle is hashed once and kept as
+the minimum of one of the signature's bins, and empty bins borrow from the next
+filled bin. This costs one hash per shingle instead of one per shingle and bin.
+
+Signatures are kept in an append-only cache file keyed by a digest of the
+question's text and answers, so a re-scan after a new pack arrives only hashes
+the questions that are new or changed.
+
+Classes:
+- NearDuplicateIndex: LSH index accepting incremental inserts.
+- SignatureCache: On-disk cache of signatures.
+
+Functions:
+- shingles: The shingle set of a question.
+- signature: The MinHash signature of a question.
+- scan: Indexes banks and packs and reports their near-duplicate pairs.
+
+Usage:
+python near_duplicates.py [BANK_OR_PACK ...] [--threshold T] [--cache PATH] [--prune]
+"""
+import argparse
+import hashlib
+import json
+import operator
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+
+from bank_lint import BankReader
+from question_store import DEFAULT_SOURCE, QuestionStore
+
+
+NUM_BINS = 128
+BANDS = 32
+SHINGLE_SIZE = 5
+# Estimated Jaccard similarity above which two questions are reported
+THRESHOLD = 0.45
+# A band value shared by more questions than this is too common to tell them apart
+MAX_BUCKET = 100
+DEFAULT_CACHE = "data/signatures.bin"
+
+_CACHE_MAGIC = b"NSQM"
+# Bump when shingling or hashing changes, so cached signatures are recomputed
+_CACHE_VERSION = 1
+_CACHE_HEADER = struct.Struct("<4sHH")
+_NON_WORD = re.compile(r"[\W_]+")
+_GOLDEN = 0x9E3779B1
+_MIX = 0x9E3779B97F4A7C15
+# Larger than any 32-bit bin value
+_EMPTY = 1 << 32
+
+
+def _normalize(text):
+    return _NON_WORD.sub(" ", str(text).lower()).strip()
+
+
+def shingles(entry):
+    """
+    Returns the shingles of a question: the SHINGLE_SIZE-byte substrings of the
+    UTF-8 encoding of its normalized text and of each of its normalized answers.
+    Args:
+        entry (dict): A question with "question" and "answers".
+    Returns:
+        set: The shingles, as bytes.
+    """
+
+    grams = set()
+    for text in (entry.get("question", ""), *entry.get("answers", {}).values()):
+        text = _normalize(text).encode("utf-8")
+        if len(text) <= SHINGLE_SIZE:
+            if text:
+                grams.add(text)
+            continue
+        grams.update(text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1))
+    return grams
+
+
+def signature(entry, num_bins=NUM_BINS):
+    """
+    Returns the one-permutation MinHash signature of a question.
+    Args:
+        entry (dict): A question with "question" and "answers".
+        num_bins (int, optional): Signature length.
+    Returns:
+        array or None: num_bins unsigned 32-bit values, or None if the question has no text.
+    """
+
+    bins = [_EMPTY] * num_bins
+    for gram in shingles(entry):
+        # CRC-32 spread over 64 bits: the low bits pick the bin, the high bits are the value
+        value = zlib.crc32(gram) * _MIX & 0xFFFFFFFFFFFFFFFF
+        b, value = value % num_bins, value >> 32
+        if value < bins[b]:
+            bins[b] = value
+    if min(bins) == _EMPTY:
+        return None
+
+    # Densify: an empty bin takes the next filled bin's value, offset by the distance
+    filled = list(bins)
+    for b in range(num_bins):
+        if filled[b] == _EMPTY:
+            distance = 1
+            while bins[(b + distance) % num_bins] == _EMPTY:
+                distance += 1
+            filled[b] = (bins[(b + distance) % num_bins] + distance * _GOLDEN) & 0xFFFFFFFF
+    return array("I", filled)
+
+
+def similarity(first, second):
+    """
+    Estimates the Jaccard similarity of two questions from their signatures.
+    """
+
+    return sum(map(operator.eq, first, second)) / len(first)
+
+
+def content_digest(entry):
+    """
+    Returns a 64-bit digest of what the signature of a question depends on.
+    """
+
+    content = json.dumps([entry.get("question", ""), sorted(map(str, entry.get("answers", {}).values()))], ensure_ascii=False)
+    return int.from_bytes(hashlib.blake2b(content.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class NearDuplicateIndex:
+    """
+    Locality-sensitive hashing index over MinHash signatures.
+    A signature is split into `bands` bands; two questions are candidates when any
+    band is identical. With r rows per band, pairs of similarity s become candidates
+    with probability 1 - (1 - s^r)^bands, about 0.5 at s = (1 / bands)^(1 / r).
+    A bucket that outgrows MAX_BUCKET usually holds a phrase every question shares
+    ("What is the purpose of"); it is dropped and ignored from then on, which keeps
+    the number of candidates per insert bounded.
+    """
+
+    def __init__(self, num_bins=NUM_BINS, bands=BANDS, threshold=THRESHOLD):
+        """
+        Args:
+            num_bins (int, optional): Signature length; must be divisible by `bands`.
+            bands (int, optional): Number of bands.
+            threshold (float, optional): Estimated similarity a candidate needs to be reported.
+        Raises:
+            ValueError: If num_bins is not divisible by bands.
+        """
+
+        if num_bins % bands:
+            raise ValueError(f"{num_bins} bins cannot be split into {bands} bands")
+        self.rows = num_bins // bands
+        self.bands = bands
+        self.threshold = threshold
+        self._signatures = {}
+        self._buckets = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _band_keys(self, sig):
+        # Hashes only need to be stable within the process, like the index itself
+        raw = sig.tobytes()
+        step = 4 * self.rows
+        return [hash(raw[start:start + step]) for start in range(0, len(raw), step)]
+
+    def _query(self, sig, keys):
+        candidates = set()
+        for buckets, band_key in zip(self._buckets, keys):
+            bucket = buckets.get(band_key)
+            if type(bucket) is list:
+                candidates.update(bucket)
+            elif bucket is not None:
+                candidates.add(bucket)
+        matches = [(key, similarity(sig, self._signatures[key])) for key in candidates]
+        return sorted((match for match in matches if match[1] >= self.threshold), key=lambda match: -match[1])
+
+    def query(self, sig):
+        """
+        Finds indexed questions similar to a signature.
+        Args:
+            sig (array): A signature from `signature`.
+        Returns:
+            list: (key, similarity) pairs at or above the threshold, most similar first.
+        """
+
+        return self._query(sig, self._band_keys(sig))
+
+    def add(self, key, sig):
+        """
+        Indexes a question and returns the already indexed questions it duplicates.
+        Args:
+            key: Unique name of the question, such as a str; not a list or None.
+            sig (array): Its signature.
+        Returns:
+            list: (key, similarity) pairs, as from `query`.
+        """
+
+        keys = self._band_keys(sig)
+        matches = self._query(sig, keys)
+        self._signatures[key] = sig
+        for buckets, band_key in zip(self._buckets, keys):
+            # Most buckets only ever hold one key, which is stored without a list
+            if band_key not in buckets:
+                buckets[band_key] = key
+                continue
+            bucket = buckets[band_key]
+            if bucket is None:
+                continue
+            if type(bucket) is not list:
+                buckets[band_key] = [bucket, key]
+            elif len(bucket) >= MAX_BUCKET:
+                # Saturated: remembered as None so it is not started again
+                buckets[band_key] = None
+            else:
+                bucket.append(key)
+        return matches
+
+
+class SignatureCache:
+    """
+    Append-only file of (content digest, signature) records.
+    Records are fixed-size; a torn record at the end is ignored. Signatures of
+    questions that were edited or removed stay cached until a save with prune=True.
+    """
+
+    def __init__(self, path, num_bins=NUM_BINS):
+        """
+        Args:
+            path (str): The cache file; created on first save.
+            num_bins (int, optional): Signature length of the cached records.
+        """
+
+        self.path = path
+        self.num_bins = num_bins
+        self._record_size = 8 + 4 * num_bins
+        self._cached = {}
+        self._new = {}
+        self._used = set()
+        self._rewrite = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                header = f.read(_CACHE_HEADER.size)
+                if len(header) < _CACHE_HEADER.size or _CACHE_HEADER.unpack(header) != (_CACHE_MAGIC, _CACHE_VERSION, self.num_bins):
+                    # Another format: every signature is recomputed and the file rewritten
+                    self._rewrite = True
+                    return
+                while True:
+                    record = f.read(self._record_size)
+                    if len(record) < self._record_size:
+                        break
+                    self._cached[int.from_bytes(record[:8], "little")] = record[8:]
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return len(self._cached) + len(self._new)
+
+    def get(self, entry):
+        """
+        Returns the signature of a question, computing it only if it is not cached.
+        Args:
+            entry (dict): A question.
+        Returns:
+            array or None: As from `signature`.
+        """
+
+        digest = content_digest(entry)
+        self._used.add(digest)
+        cached = self._cached.get(digest)
+        if cached is not None:
+            return array("I", cached)
+        sig = self._new.get(digest)
+        if sig is None and digest not in self._new:
+            sig = self._new[digest] = signature(entry, self.num_bins)
+        return sig
+
+    def save(self, prune=False):
+        """
+        Writes the signatures computed since the cache was loaded.
+        Args:
+            prune (bool, optional): Rewrite the file keeping only the signatures looked up
+                since it was loaded.
+        Returns:
+            int: Number of new signatures written.
+        """
+
+        new = {digest: sig for digest, sig in self._new.items() if sig is not None}
+        if self._rewrite or prune:
+            records = {digest: record for digest, record in self._cached.items() if not prune or digest in self._used}
+            records.update((digest, sig.tobytes()) for digest, sig in new.items())
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_CACHE_HEADER.pack(_CACHE_MAGIC, _CACHE_VERSION, self.num_bins))
+                f.writelines(digest.to_bytes(8, "little") + record for digest, record in records.items())
+            os.replace(tmp_path, self.path)
+            self._rewrite = False
+            self._cached = records
+        else:
+            exists = os.path.exists(self.path)
+            with open(self.path, "ab") as f:
+                if not exists:
+                    f.write(_CACHE_HEADER.pack(_CACHE_MAGIC, _CACHE_VERSION, self.num_bins))
+                # Drop a torn record left by an interrupted save so records stay aligned
+                f.truncate(_CACHE_HEADER.size + len(self._cached) * self._record_size)
+                f.writelines(digest.to_bytes(8, "little") + sig.tobytes() for digest, sig in new.items())
+            self._cached.update((digest, sig.tobytes()) for digest, sig in new.items())
+        self._new.clear()
+        return len(new)
+
+
+def _questions(path):
+    # Yields (key, entry) for a JSON bank, streamed, or for a compiled pack
+    if path.endswith(".pack"):
+        store = QuestionStore(path)
+        try:
+            for position in range(len(store)):
+                entry = store[position]
+                yield entry["key"], entry
+        finally:
+            store.close()
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for key, entry, _, _ in BankReader(f).questions():
+            if isinstance(entry, dict):
+                yield key, entry
+
+
+def scan(paths, index=None, cache=None):
+    """
+    Adds every question of the given banks and packs to an index.
+    Args:
+        paths (list): JSON banks (streamed) and compiled packs (*.pack).
+        index (NearDuplicateIndex, optional): Index to add to; a new one by default.
+        cache (SignatureCache, optional): Where signatures are looked up and stored.
+    Yields:
+        tuple: (key, other key, similarity) for each question similar to one added
+        before it. Keys are "PATH:KEY".
+    """
+
+    if index is None:
+        index = NearDuplicateIndex()
+    for path in paths:
+        for key, entry in _questions(path):
+            sig = signature(entry, NUM_BINS) if cache is None else cache.get(entry)
+            if sig is None:
+                continue
+            name = f"{path}:{key}"
+            for other, score in index.add(name, sig):
+                yield name, other, score
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report near-duplicate questions across banks and packs.")
+    parser.add_argument("banks", nargs="*", default=[DEFAULT_SOURCE], help="JSON banks or compiled packs (*.pack)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="estimated similarity to report (0-1)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="signature cache file")
+    parser.add_argument("--no-cache", action="store_true", help="hash every question and leave the cache untouched")
+    parser.add_argument("--prune", action="store_true", help="drop cached signatures of questions not in the scanned banks")
+    args = parser.parse_args(argv)
+
+    cache = None if args.no_cache else SignatureCache(args.cache)
+    index = NearDuplicateIndex(threshold=args.threshold)
+    pairs = 0
+    for name, other, score in scan(args.banks, index, cache):
+        print(f"{score:.2f}  {name}  ~  {other}")
+        pairs += 1
+    hashed = len(index) if cache is None else cache.save(prune=args.prune)
+    print(f"{len(index)} questions indexed, {hashed} hashed, {pairs} near-duplicate pair(s)", file=sys.stderr)
+    return 1 if pairs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
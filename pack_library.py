@@ -0,0 +1,163 @@
+"""
+Pack Library
+
+The question packs installed for Programmer's Squid Game, by language and topic.
+
+Packs live in data/packs/<language>/<topic>.json, each a JSON bank with a
+"questions" mapping, and are compiled next to their source into <topic>.pack.
+Nothing is read until a pack is selected. A selected pack is opened as a
+`question_store.QuestionStore` and kept in a least-recently-used cache of open
+packs, so switching back to a language or topic played before is instant. Packs
+that fall out of the cache are unmapped and their decoded questions dropped,
+which caps memory however many packs are installed.
+
+Classes:
+- PackLibrary: Lists the installed packs and opens them through an LRU cache.
+
+Usage:
+python pack_library.py [--compile]
+"""
+import argparse
+import os
+import sys
+from collections import OrderedDict
+
+from question_store import DEFAULT_SOURCE, QuestionStore, compile_pack
+
+
+PACKS_ROOT = "data/packs"
+# DEFAULT_SOURCE is data/packs/<language>/<topic>.json
+DEFAULT_LANGUAGE = os.path.basename(os.path.dirname(DEFAULT_SOURCE))
+DEFAULT_TOPIC = os.path.splitext(os.path.basename(DEFAULT_SOURCE))[0]
+MAX_OPEN_PACKS = 4
+# Decoded questions kept per open pack
+PACK_CACHE_SIZE = 256
+
+
+class PackLibrary:
+    """
+    Installed question packs, opened lazily and cached least-recently-used first out.
+    """
+
+    def __init__(self, root=PACKS_ROOT, max_open=MAX_OPEN_PACKS, cache_size=PACK_CACHE_SIZE):
+        """
+        Args:
+            root (str, optional): Directory holding one subdirectory per language.
+            max_open (int, optional): Number of packs kept open.
+            cache_size (int, optional): Decoded questions kept by each open pack.
+        """
+
+        self.root = root
+        self.max_open = max_open
+        self.cache_size = cache_size
+        self._open = OrderedDict()
+
+    def languages(self):
+        """
+        Returns:
+            list: Language codes with at least one pack, sorted.
+        """
+
+        try:
+            entries = os.scandir(self.root)
+        except FileNotFoundError:
+            return []
+        with entries:
+            return sorted(entry.name for entry in entries if entry.is_dir() and self.topics(entry.name))
+
+    def topics(self, language):
+        """
+        Returns:
+            list: Topics installed for a language, sorted.
+        """
+
+        try:
+            names = os.listdir(os.path.join(self.root, language))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(".json")] for name in names if name.endswith(".json"))
+
+    def source(self, language, topic):
+        return os.path.join(self.root, language, f"{topic}.json")
+
+    def pack_path(self, language, topic):
+        return os.path.join(self.root, language, f"{topic}.pack")
+
+    def stats_path(self, language, topic):
+        # Adaptive answer statistics, kept per pack as positions differ between packs
+        return os.path.join(self.root, language, f"{topic}.stats")
+
+    def telemetry_path(self, language, topic):
+        return os.path.join(self.root, language, f"{topic}.telemetry")
+
+    def get(self, language, topic):
+        """
+        Returns the pack for a language and topic, opening it if it is not cached.
+        The pack file is compiled from its JSON source on first access if it is
+        missing or stale.
+        Args:
+            language (str): Language code, e.g. "en".
+            topic (str): Topic name, e.g. "computing".
+        Returns:
+            QuestionStore: The pack.
+        Raises:
+            KeyError: If no such pack is installed.
+        """
+
+        key = (language, topic)
+        store = self._open.get(key)
+        if store is not None:
+            self._open.move_to_end(key)
+            return store
+
+        if not os.path.exists(self.source(language, topic)):
+            raise KeyError(f"no {topic!r} pack installed for language {language!r}")
+        store = self._open[key] = QuestionStore(self.pack_path(language, topic), source=self.source(language, topic), cache_size=self.cache_size)
+        while len(self._open) > self.max_open:
+            _, evicted = self._open.popitem(last=False)
+            evicted.close()
+        return store
+
+    def cached(self):
+        """
+        Returns:
+            list: (language, topic) of the open packs, least recently used first.
+        """
+
+        return list(self._open)
+
+    def close(self):
+        """
+        Closes every open pack.
+        """
+
+        for store in self._open.values():
+            store.close()
+        self._open.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the installed question packs.")
+    parser.add_argument("--root", default=PACKS_ROOT)
+    parser.add_argument("--compile", action="store_true", help="validate and compile every pack")
+    args = parser.parse_args(argv)
+
+    library = PackLibrary(args.root)
+    failed = 0
+    for language in library.languages():
+        for topic in library.topics(language):
+            if not args.compile:
+                print(f"{language}/{topic}")
+                continue
+            try:
+                count = compile_pack(library.source(language, topic), library.pack_path(language, topic))
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                failed += 1
+                continue
+            print(f"{language}/{topic}: {count} questions")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,628 @@
+"""
+Question Store
+
+Lazily-loaded, memory-mapped question packs for Programmer's Squid Game.
+
+A pack is compiled once from a JSON question bank (the `questions` mapping of
+question / answers / correct entries) and then memory-mapped on first use, so
+opening a bank costs the same whether it holds 20 questions or 2 million.
+Only the questions that are actually asked get decoded.
+
+Pack layout (little endian):
+- Header: magic, version, question count, offsets of the offset table, the digest
+  table and the index, and a CRC-32 of everything after the header.
+- Records: one compact UTF-8 JSON object per question.
+- Offset table: count + 1 unsigned 64-bit offsets, record i spans [off[i], off[i + 1]).
+- Digest table: one 64-bit BLAKE2b digest per record.
+- Index: a small JSON directory mapping each field ("category", "difficulty", "tag")
+  and value to a (start, length) slice of a flat array of unsigned 32-bit positions.
+
+Questions are addressed by their 0-based position in the pack. Sampling a random
+question, optionally restricted to one category, difficulty or tag, is O(1).
+
+Decoded questions are cached by record digest. When a recompiled pack is swapped
+in with `reload_if_changed` (or checked with `open_replacement`, possibly in a
+worker thread, and swapped in with `adopt`), questions whose records did not
+change are served from that cache instead of being decoded again.
+A replacement that fails its CRC is ignored until the file is replaced again.
+Hot reload relies on replacing a pack while it is mapped, which only POSIX
+systems allow; on Windows a pack can only be recompiled while no game has it open.
+
+Classes:
+- QuestionStore: Read-only view over a pack file.
+
+Functions:
+- validate_entry: Lists the problems with one question.
+- build_pack: Writes a pack from (key, entry) pairs.
+- compile_pack: Validates a JSON bank and writes its pack.
+- ensure_pack: Recompiles a pack when its JSON source is newer.
+- relocate: Maps the positions of a pack's records to a recompiled pack.
+
+Usage:
+python question_store.py compile-pack [SOURCE] [PACK]
+python question_store.py verify [PACK]
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import zlib
+from array import array
+from collections import OrderedDict
+
+
+MAGIC = b"NSQP"
+VERSION = 2
+INDEXED_FIELDS = ("category", "difficulty", "tag")
+DEFAULT_SOURCE = "data/packs/en/computing.json"
+DEFAULT_PACK = "data/packs/en/computing.pack"
+
+_HEADER = struct.Struct("<4sHHIQQQI")
+
+
+def _entry_key(key):
+    # Numeric keys ("1", "2", ... "10") keep their natural order.
+    return (0, int(key), "") if str(key).isdigit() else (1, 0, str(key))
+
+
+def _digest(record):
+    return int.from_bytes(hashlib.blake2b(record, digest_size=8).digest(), "little")
+
+
+class _ChecksumWriter:
+    """
+    Writes to a file while keeping a running CRC-32 of the bytes written.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.crc = 0
+
+    def write(self, chunk):
+        self.crc = zlib.crc32(chunk, self.crc)
+        self.f.write(chunk)
+
+    def tell(self):
+        return self.f.tell()
+
+    def align(self, boundary):
+        padding = -self.f.tell() % boundary
+        if padding:
+            self.write(b"\0" * padding)
+
+
+def validate_entry(key, entry):
+    """
+    Checks one question of a bank.
+    Args:
+        key (str): The question's key in the bank.
+        entry: The question, expected to be a dict.
+    Returns:
+        list: Human-readable problems, empty if the question is valid.
+    """
+
+    if not isinstance(entry, dict):
+        return [f"question {key}: expected an object, got {type(entry).__name__}"]
+
+    errors = []
+    if not isinstance(entry.get("question"), str) or not entry["question"].strip():
+        errors.append(f"question {key}: 'question' must be a non-empty string")
+    answers = entry.get("answers")
+    if not isinstance(answers, dict) or not answers:
+        errors.append(f"question {key}: 'answers' must be a non-empty object")
+    elif not all(isinstance(text, str) for text in answers.values()):
+        errors.append(f"question {key}: every answer must be a string")
+    if "correct" not in entry:
+        errors.append(f"question {key}: 'correct' is missing")
+    elif isinstance(answers, dict) and entry["correct"] not in answers:
+        errors.append(f"question {key}: 'correct' is {entry['correct']!r}, which is not one of the answer keys {sorted(answers)}")
+    for field in ("category", "difficulty"):
+        if entry.get(field) is not None and not isinstance(entry[field], str):
+            errors.append(f"question {key}: '{field}' must be a string")
+    tags = entry.get("tags")
+    if tags is not None and (not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags)):
+        errors.append(f"question {key}: 'tags' must be a list of strings")
+    return errors
+
+
+def build_pack(entries, path):
+    """
+    Writes a question pack to `path`.
+    Args:
+        entries (iterable): (key, entry) pairs where entry is a dict with "question",
+            "answers", "correct" and optionally "category", "difficulty" and "tags".
+            Entries are stored in the order given.
+        path (str): Destination of the pack. It is written to a temporary file first
+            and atomically moved into place.
+    Returns:
+        int: The number of questions written.
+    Raises:
+        ValueError: On Windows, if the pack is open in a running game. Windows does not
+            replace a file that is memory-mapped, so packs can only be hot-reloaded on POSIX systems.
+    """
+
+    postings = {field: {} for field in INDEXED_FIELDS}
+    offsets = array("Q")
+    digests = array("Q")
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        out = _ChecksumWriter(f)
+        for position, (key, entry) in enumerate(entries):
+            offsets.append(out.tell())
+            record = {
+                "key": str(key),
+                "question": entry["question"],
+                "answers": entry["answers"],
+                "correct": entry["correct"],
+            }
+            for field in ("category", "difficulty", "tags"):
+                if entry.get(field) is not None:
+                    record[field] = entry[field]
+            record = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            out.write(record)
+            digests.append(_digest(record))
+
+            values = {
+                "category": [entry.get("category")],
+                "difficulty": [entry.get("difficulty")],
+                "tag": entry.get("tags") or [],
+            }
+            for field, field_values in values.items():
+                for value in field_values:
+                    if value is not None:
+                        postings[field].setdefault(str(value), array("I")).append(position)
+        count = len(offsets)
+        offsets.append(out.tell())
+
+        out.align(8)
+        table_offset = out.tell()
+        out.write(offsets.tobytes())
+        digest_offset = out.tell()
+        out.write(digests.tobytes())
+
+        directory = {field: {} for field in INDEXED_FIELDS}
+        flat = array("I")
+        for field in INDEXED_FIELDS:
+            for value, positions in postings[field].items():
+                directory[field][value] = [len(flat), len(positions)]
+                flat.extend(positions)
+        directory_bytes = json.dumps(directory, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        index_offset = out.tell()
+        out.write(struct.pack("<I", len(directory_bytes)))
+        out.write(directory_bytes)
+        out.align(4)
+        out.write(flat.tobytes())
+
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, count, table_offset, digest_offset, index_offset, out.crc))
+
+    try:
+        os.replace(tmp_path, path)
+    except PermissionError:
+        os.remove(tmp_path)
+        if os.name != "nt":
+            raise
+        raise ValueError(f"{path} is open in a running game; close it before recompiling the pack") from None
+    return count
+
+
+def compile_pack(source, path):
+    """
+    Validates the JSON bank at `source` and compiles it into a pack.
+    Args:
+        source (str): Path to a JSON file with a top-level "questions" mapping.
+        path (str): Path of the pack file.
+    Returns:
+        int: The number of questions written.
+    Raises:
+        ValueError: If any question is invalid, or on Windows if the pack is in use.
+            Nothing is written in that case.
+    """
+
+    with open(source, "r", encoding="utf-8") as f:
+        questions = json.load(f)["questions"]
+
+    errors = [error for key, entry in questions.items() for error in validate_entry(key, entry)]
+    if errors:
+        raise ValueError(f"{source} has {len(errors)} invalid question(s):\n" + "\n".join(errors))
+    return build_pack(sorted(questions.items(), key=lambda item: _entry_key(item[0])), path)
+
+
+def _pack_version(path):
+    try:
+        with open(path, "rb") as f:
+            magic, version = struct.unpack("<4sH", f.read(6))
+    except (OSError, struct.error):
+        return None
+    return version if magic == MAGIC else None
+
+
+def ensure_pack(source, path):
+    """
+    Compiles the pack at `path` from the JSON bank at `source` if the pack is missing,
+    older than the source or in an older format.
+    Args:
+        source (str): Path to a JSON file with a top-level "questions" mapping.
+        path (str): Path of the pack file.
+    Returns:
+        bool: True if the pack was (re)built, False if it was already up to date.
+    """
+
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source) and _pack_version(path) == VERSION:
+        return False
+
+    compile_pack(source, path)
+    return True
+
+
+def _common_run(old, new, suffix=False):
+    # Length of the longest common prefix (or suffix) of two arrays, by binary search
+    # over slice comparisons, which run in C
+    low, high = 0, min(len(old), len(new))
+    while low < high:
+        middle = (low + high + 1) // 2
+        same = old[-middle:] == new[-middle:] if suffix else old[:middle] == new[:middle]
+        if same:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def relocate(old, new):
+    """
+    Maps the positions of a pack's records to their positions in a recompiled pack,
+    matching records by digest. Unchanged runs at the start and end are found with
+    bulk comparisons, so only the edited middle is matched one record at a time.
+    Args:
+        old (array): Digest of each position before, as from `QuestionStore.digests`.
+        new (array): Digest of each position after.
+    Returns:
+        array or None: The new position of each old position, -1 for records no
+        longer in the pack, or None if no record moved.
+    """
+
+    if old == new:
+        return None
+    prefix = _common_run(old, new)
+    suffix = _common_run(old[prefix:], new[prefix:], suffix=True)
+    moved_end = len(new) - suffix
+    rows = {digest: position for position, digest in enumerate(new[prefix:moved_end], prefix)}
+    relocation = array("q", range(prefix))
+    relocation.extend(rows.get(digest, -1) for digest in old[prefix:len(old) - suffix])
+    relocation.extend(range(moved_end, len(new)))
+    return relocation
+
+
+class QuestionStore:
+    """
+    Read-only, lazily opened view over a question pack.
+    The pack file is memory-mapped on first access. Records are decoded one at a
+    time when requested and kept in a small cache keyed by their digest, so resident
+    memory does not grow with the bank size.
+    """
+
+    def __init__(self, path, source=None, cache_size=1024):
+        """
+        Args:
+            path (str): Path of the pack file.
+            source (str, optional): JSON bank the pack is compiled from. When given, the
+                pack is recompiled on first access if it is missing or stale.
+            cache_size (int, optional): Number of decoded questions to keep.
+        """
+
+        self.path = path
+        self.source = source
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._file = None
+        self._mmap = None
+        self._offsets = None
+        self._digests = None
+        self._postings = None
+        self._directory = None
+        self._count = 0
+        self._checksum = 0
+        self._identity = None
+        self._rejected = None
+
+    def _open(self):
+        if self._mmap is not None:
+            return
+        if self.source:
+            ensure_pack(self.source, self.path)
+
+        self._file = open(self.path, "rb")
+        stat = os.fstat(self._file.fileno())
+        self._identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, table_offset, digest_offset, index_offset, checksum = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{self.path} is not a version {VERSION} question pack")
+
+        view = memoryview(self._mmap)
+        self._count = count
+        self._checksum = checksum
+        self._offsets = view[table_offset:table_offset + (count + 1) * 8].cast("Q")
+        self._digests = view[digest_offset:digest_offset + count * 8].cast("Q")
+
+        (directory_len,) = struct.unpack_from("<I", self._mmap, index_offset)
+        directory_start = index_offset + 4
+        self._directory = json.loads(bytes(self._mmap[directory_start:directory_start + directory_len]))
+        postings_start = directory_start + directory_len
+        postings_start += -postings_start % 4
+        postings_end = len(self._mmap)
+        postings_end -= (postings_end - postings_start) % 4
+        self._postings = view[postings_start:postings_end].cast("I")
+
+    def close(self):
+        """
+        Unmaps the pack file. The store reopens it on the next access.
+        Decoded questions stay cached.
+        """
+
+        for name in ("_offsets", "_digests", "_postings"):
+            view = getattr(self, name)
+            if view is not None:
+                view.release()
+                setattr(self, name, None)
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A caller still holds a positions() view; the map goes away with it
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._directory = None
+
+    def verify(self):
+        """
+        Checks the pack against the CRC-32 stored in its header.
+        Returns:
+            bool: True if the pack is intact.
+        """
+
+        self._open()
+        crc = 0
+        for start in range(_HEADER.size, len(self._mmap), 1 << 20):
+            crc = zlib.crc32(self._mmap[start:start + (1 << 20)], crc)
+        return crc == self._checksum
+
+    def changed(self):
+        """
+        Tells whether the pack file on disk was replaced since it was opened.
+        A replacement that `open_replacement` rejected does not count until it is replaced in turn.
+        Returns:
+            bool: True if the pack should be reloaded.
+        """
+
+        if self._mmap is None:
+            return False
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return identity != self._identity and identity != self._rejected
+
+    def open_replacement(self):
+        """
+        Opens the pack file on disk as a new store and checks it against its CRC-32.
+        This store only notes a rejected file, so the check can run in a worker thread
+        while questions are still served from the current pack.
+        Returns:
+            QuestionStore or None: The new pack, or None if it fails the check.
+        """
+
+        candidate = QuestionStore(self.path, cache_size=0)
+        try:
+            intact = candidate.verify()
+        except (OSError, ValueError):
+            intact = False
+        if not intact:
+            candidate.close()
+            # Set once the file was opened; a file that could not be opened is tried again
+            self._rejected = candidate._identity
+            return None
+        return candidate
+
+    def adopt(self, candidate):
+        """
+        Swaps in a pack opened by `open_replacement`, keeping the decoded question cache.
+        The candidate is left closed.
+        """
+
+        self.close()
+        for name in ("_file", "_mmap", "_offsets", "_digests", "_postings", "_directory", "_count", "_checksum", "_identity"):
+            setattr(self, name, getattr(candidate, name))
+        candidate._file = candidate._mmap = candidate._offsets = candidate._digests = candidate._postings = candidate._directory = None
+
+    def reload_if_changed(self):
+        """
+        Swaps to the pack on disk if it was replaced and passes its checksum.
+        A pack that fails the check is ignored and the current one kept.
+        The check reads the whole pack; see `open_replacement` to run it off the calling thread.
+        Returns:
+            bool: True if a new pack was swapped in.
+        """
+
+        if not self.changed():
+            return False
+        candidate = self.open_replacement()
+        if candidate is None:
+            return False
+        self.adopt(candidate)
+        return True
+
+    def __len__(self):
+        self._open()
+        return self._count
+
+    def digests(self):
+        """
+        Returns:
+            array: A copy of the record digest of every position.
+        """
+
+        self._open()
+        digests = array("Q")
+        digests.frombytes(self._digests.cast("B"))
+        return digests
+
+    def digest(self, position):
+        """
+        Returns the digest of the record at a 0-based position. Equal digests mean equal questions.
+        """
+
+        self._open()
+        return self._digests[position]
+
+    def __getitem__(self, position):
+        """
+        Decodes the question stored at a 0-based position.
+        Args:
+            position (int): Position of the question in the pack.
+        Returns:
+            dict: The question record with "key", "question", "answers" and "correct".
+        Raises:
+            IndexError: If the position is out of range.
+        """
+
+        self._open()
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError(f"question position {position} out of range")
+
+        digest = self._digests[position]
+        question = self._cache.get(digest)
+        if question is not None:
+            self._cache.move_to_end(digest)
+            return question
+
+        start, end = self._offsets[position], self._offsets[position + 1]
+        question = json.loads(self._mmap[start:end])
+        if self.cache_size:
+            self._cache[digest] = question
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return question
+
+    def values(self, field):
+        """
+        Lists the indexed values of a field.
+        Args:
+            field (str): One of "category", "difficulty" or "tag".
+        Returns:
+            list: The distinct values present in the pack.
+        """
+
+        self._open()
+        return list(self._directory[field])
+
+    def positions(self, field, value):
+        """
+        Returns the positions of the questions indexed under a field value.
+        Args:
+            field (str): One of "category", "difficulty" or "tag".
+            value (str): The value to look up.
+        Returns:
+            memoryview: A read-only sequence of 0-based positions, empty if the value is unknown.
+        """
+
+        self._open()
+        start, length = self._directory[field].get(str(value), (0, 0))
+        return self._postings[start:start + length]
+
+    def sample(self, category=None, difficulty=None, tag=None, rng=random):
+        """
+        Picks a random question position, optionally matching the given filters.
+        A single filter (or none) is answered in O(1). With several filters the
+        smallest candidate list is sampled and the others are checked per pick.
+        Args:
+            category (str, optional): Restrict to this category.
+            difficulty (str, optional): Restrict to this difficulty.
+            tag (str, optional): Restrict to questions carrying this tag.
+            rng (random.Random, optional): Source of randomness.
+        Returns:
+            int or None: A 0-based position, or None if no question matches.
+        """
+
+        self._open()
+        filters = [(field, value) for field, value in zip(INDEXED_FIELDS, (category, difficulty, tag)) if value is not None]
+        if not filters:
+            return rng.randrange(self._count) if self._count else None
+
+        candidates = sorted((self.positions(field, value) for field, value in filters), key=len)
+        smallest, others = candidates[0], candidates[1:]
+        if not others:
+            return smallest[rng.randrange(len(smallest))] if len(smallest) else None
+
+        # Postings are sorted, so membership in the other lists is a binary search.
+        def matches(position):
+            for positions in others:
+                lo, hi = 0, len(positions)
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if positions[mid] < position:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                if lo == len(positions) or positions[lo] != position:
+                    return False
+            return True
+
+        for _ in range(min(len(smallest), 32)):
+            position = smallest[rng.randrange(len(smallest))]
+            if matches(position):
+                return position
+        matching = [position for position in smallest if matches(position)]
+        return rng.choice(matching) if matching else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile and check question packs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = commands.add_parser("compile-pack", help="validate a JSON bank and compile it into a pack")
+    compile_parser.add_argument("source", nargs="?", default=DEFAULT_SOURCE)
+    compile_parser.add_argument("pack", nargs="?", default=DEFAULT_PACK)
+
+    verify_parser = commands.add_parser("verify", help="check a pack against its checksum")
+    verify_parser.add_argument("pack", nargs="?", default=DEFAULT_PACK)
+
+    args = parser.parse_args(argv)
+    if args.command == "compile-pack":
+        try:
+            count = compile_pack(args.source, args.pack)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"Compiled {count} questions from {args.source} into {args.pack}")
+        return 0
+
+    store = QuestionStore(args.pack)
+    try:
+        intact = store.verify()
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+    print(f"{args.pack}: {'OK' if intact else 'checksum mismatch'}")
+    return 0 if intact else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
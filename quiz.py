@@ -0,0 +1,127 @@
+"""
+Quiz Engine
+
+Headless game logic for Programmer's Squid Game. A `QuizSession` scores answers,
+advances through the questions and decides when the game is over and whether it
+was won. It knows nothing about customtkinter and never touches the filesystem
+itself: the questions are read through whatever sequence it is given, normally a
+`question_store.QuestionStore`.
+
+Classes:
+- QuizSession: State of one play-through.
+"""
+
+
+# Minimum score needed to win the game
+PASS_MARK = 18
+
+
+class QuizSession:
+    """
+    One play-through of the trivia questions.
+    By default the questions are asked in order, from the first to the last. With
+    a selector (see `adaptive.AdaptiveSelector`) each question is drawn by the
+    selector instead and every answer is reported back to it.
+    The question number is 1-based and stays on the last question once the game
+    is finished; `position` is the 0-based position of the current question.
+    """
+
+    __slots__ = ("questions", "pass_mark", "selector", "length", "total", "number", "position", "score", "finished")
+
+    def __init__(self, questions, pass_mark=PASS_MARK, selector=None, length=None):
+        """
+        Args:
+            questions (sequence): Question records indexed from 0, each with a "correct" answer key.
+            pass_mark (int, optional): Score needed to win. Defaults to PASS_MARK.
+            selector (optional): Object with start(), pick() and record(position, correct, seconds)
+                that chooses the questions. Defaults to asking them in order.
+            length (int, optional): Number of questions per game. Defaults to every question.
+        """
+
+        self.questions = questions
+        self.pass_mark = pass_mark
+        self.selector = selector
+        self.length = length
+        self.reset()
+
+    def reset(self):
+        """
+        Starts the session over from the first question with a score of 0.
+        """
+
+        self.total = self._game_length()
+        self.number = 1
+        self.score = 0
+        self.finished = False
+        if self.selector is None:
+            self.position = 0
+        else:
+            self.selector.start()
+            self.position = self.selector.pick()
+
+    def _game_length(self):
+        if self.length is None:
+            return len(self.questions)
+        return min(self.length, len(self.questions))
+
+    def resize(self, position=None):
+        """
+        Adapts to a question bank that changed, e.g. after a pack reload, keeping
+        the score and progress of the game in flight.
+        Args:
+            position (int, optional): The new position of the current question, if it
+                moved. When questions are asked in order the question number follows it,
+                so the game carries on from the same question.
+        """
+
+        self.total = self._game_length()
+        if position is not None:
+            self.position = position
+            if self.selector is None:
+                self.number = position + 1
+        self.number = min(self.number, self.total)
+        self.position = min(self.position, len(self.questions) - 1)
+
+    @property
+    def passed(self):
+        return self.score >= self.pass_mark
+
+    def current(self):
+        """
+        Returns the question currently being asked.
+        Returns:
+            dict: The question record.
+        """
+
+        return self.questions[self.position]
+
+    def answer(self, choice, question=None, seconds=None):
+        """
+        Scores an answer to the current question and moves on to the next one.
+        Args:
+            choice (str): The answer key picked by the player, e.g. "A".
+            question (dict, optional): The current question, if the caller already has it.
+            seconds (float, optional): Time the player took, reported to the selector.
+        Returns:
+            bool: True if the answer was correct.
+        Raises:
+            RuntimeError: If the session is already finished.
+        """
+
+        if self.finished:
+            raise RuntimeError("the quiz session is already finished")
+        if question is None:
+            question = self.questions[self.position]
+
+        correct = choice == question["correct"]
+        if correct:
+            self.score += 1
+        if self.selector is not None:
+            self.selector.record(self.position, correct, seconds)
+
+        if self.number < self.total:
+            self.number += 1
+            self.position = self.number - 1 if self.selector is None else self.selector.pick()
+        else:
+            self.finished = True
+        return correct
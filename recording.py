@@ -0,0 +1,406 @@
+"""
+Recording
+
+Compact binary recordings of trivia sessions, and a headless replay tool.
+
+Each run of the game writes one recording: a header followed by fixed-size
+events. Events are packed into an in-memory buffer as they happen, which costs
+about a microsecond, and the buffer is written out when a game ends and when the
+game closes.
+
+Recording layout (little endian):
+- Header: magic, version, flags (1 = adaptive), pass mark, game length (0 = every
+  question), wall-clock start time.
+- Events: kind, argument, milliseconds since the start, question position and a
+  64-bit value.
+
+Events:
+- START: A game starts. position is its number of questions. argument is the
+  number of event-sized slots that follow it holding the pack the game is played
+  on, as UTF-8 "language/topic" padded with zeros (0 if not recorded).
+- QUESTION: A question is shown. value is its record digest in the pack.
+- ANSWER: A question is answered. argument is the index of the chosen answer
+  (NO_CHOICE if none), plus CORRECT if it was scored correct.
+- FRAME: The screen changes. argument indexes FRAMES.
+- END: The game is over. position is the score, argument 1 if the game was won.
+
+Replaying pushes the recorded answers through `quiz.QuizSession` against a
+question pack, without a display and without waiting between events. Each
+session is replayed on the pack it was played on, opened through a
+`pack_library.PackLibrary`, unless a pack is given for all of them. Every
+answer's scoring, every question asked and every final score is compared with
+the recording, and recordings are spread over a pool of worker processes.
+
+Classes:
+- SessionRecorder: Records the sessions of one run of the game.
+- ReplaySelector: Asks the questions in the recorded order.
+
+Functions:
+- read_recording: Decodes a recording into its header and sessions.
+- replay_session: Replays one recorded session.
+- replay: Replays recordings across a process pool.
+
+Usage:
+python recording.py replay [RECORDING ...] [--pack PATH | --root DIR] [--jobs N] [--repeat N]
+python recording.py show RECORDING
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import struct
+import sys
+import time
+
+from pack_library import DEFAULT_LANGUAGE, DEFAULT_TOPIC, PACKS_ROOT, PackLibrary
+from question_store import QuestionStore
+from quiz import PASS_MARK, QuizSession
+
+
+MAGIC = b"NSQR"
+VERSION = 2
+# Version 1 recordings have no pack slots; their sessions are replayed on the default pack
+READ_VERSIONS = (1, 2)
+DEFAULT_DIRECTORY = "data/recordings"
+FRAMES = ("welcome", "trivia", "loader", "notice")
+
+START, QUESTION, ANSWER, FRAME, END = range(5)
+KINDS = ("start", "question", "answer", "frame", "end")
+CORRECT = 0x80
+NO_CHOICE = 0x7F
+ADAPTIVE = 1
+
+HEADER = struct.Struct("<4sHHHHd")
+# kind, argument, milliseconds, position, value
+EVENT = struct.Struct("<BBIIQ")
+
+
+class SessionRecorder:
+    """
+    Records the trivia sessions of one run of the game into a single file.
+    The file is only created once there is something to write.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, pass_mark=PASS_MARK, length=None, adaptive=False):
+        """
+        Args:
+            directory (str, optional): Where recordings are written.
+            pass_mark (int, optional): Score needed to win.
+            length (int, optional): Questions per game, if not every question.
+            adaptive (bool, optional): Whether questions are picked adaptively.
+        """
+
+        self.started = time.time()
+        self._clock = time.perf_counter()
+        self.path = os.path.join(directory, time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started)) + f"-{os.getpid()}.nsqr")
+        self._buffer = bytearray(HEADER.pack(MAGIC, VERSION, ADAPTIVE if adaptive else 0, pass_mark, length or 0, self.started))
+        self._events = 0
+
+    def _event(self, kind, argument=0, position=0, value=0):
+        milliseconds = int((time.perf_counter() - self._clock) * 1000) & 0xFFFFFFFF
+        self._buffer += EVENT.pack(kind, argument, milliseconds, position, value)
+        self._events += 1
+
+    def start(self, total, pack=None):
+        """
+        Records the start of a game.
+        Args:
+            total (int): Number of questions in the game.
+            pack (str, optional): The pack it is played on, as "language/topic".
+        """
+
+        name = pack.encode("utf-8") if pack else b""
+        slots = -(-len(name) // EVENT.size)
+        self._event(START, slots, position=total)
+        self._buffer += name.ljust(slots * EVENT.size, b"\0")
+
+    def question(self, position, digest):
+        self._event(QUESTION, position=position, value=digest)
+
+    def answer(self, position, question, choice, correct):
+        """
+        Records an answer.
+        Args:
+            position (int): Position of the answered question.
+            question (dict): The answered question.
+            choice (str): The chosen answer key, or None/"" if nothing was chosen.
+            correct (bool): Whether it was scored correct.
+        """
+
+        argument = NO_CHOICE
+        for index, key in enumerate(question["answers"]):
+            if key == choice:
+                argument = min(index, NO_CHOICE - 1)
+                break
+        self._event(ANSWER, argument | (CORRECT if correct else 0), position)
+
+    def frame(self, name):
+        self._event(FRAME, FRAMES.index(name) if name in FRAMES else 0xFF)
+
+    def end(self, score, passed):
+        self._event(END, 1 if passed else 0, score)
+        self.flush()
+
+    def flush(self):
+        """
+        Appends the buffered events to the recording.
+        """
+
+        if not self._events:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(self._buffer)
+        self._buffer.clear()
+        self._events = 0
+
+    close = flush
+
+
+def read_recording(path):
+    """
+    Decodes a recording.
+    Args:
+        path (str): The recording file.
+    Returns:
+        tuple: (header, sessions) where header is a dict and each session is a
+        (pack, events) pair: the "language/topic" it was played on (None if not
+        recorded) and its list of (kind, argument, milliseconds, position, value)
+        events, starting with START.
+    Raises:
+        ValueError: If the file is not a recording.
+    """
+
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a session recording")
+    magic, version, flags, pass_mark, length, started = HEADER.unpack_from(data)
+    if magic != MAGIC or version not in READ_VERSIONS:
+        raise ValueError(f"{path} is not a version {VERSION} session recording")
+    header = {"adaptive": bool(flags & ADAPTIVE), "pass_mark": pass_mark, "length": length or None, "started": started}
+
+    # A torn event at the end, from a crash mid-write, is ignored
+    sessions = []
+    start = HEADER.size
+    while start + EVENT.size <= len(data):
+        event = EVENT.unpack_from(data, start)
+        start += EVENT.size
+        if event[0] == START:
+            pack = None
+            if event[1]:
+                pack = bytes(data[start:start + event[1] * EVENT.size]).rstrip(b"\0").decode("utf-8", errors="replace")
+                start += event[1] * EVENT.size
+            sessions.append((pack, [event]))
+        elif sessions:
+            sessions[-1][1].append(event)
+    return header, sessions
+
+
+class ReplaySelector:
+    """
+    Selector for `QuizSession` that asks the recorded questions in the recorded order.
+    Used for adaptive sessions, whose question order was random.
+    """
+
+    def __init__(self, positions):
+        self.positions = positions
+        self._next = 0
+
+    def start(self):
+        self._next = 0
+
+    def pick(self):
+        # A session that asks for more questions than were recorded has diverged;
+        # keep it going on the last recorded question so the mismatch gets reported
+        position = self.positions[min(self._next, len(self.positions) - 1)] if self.positions else 0
+        self._next += 1
+        return position
+
+    def record(self, position, correct, seconds):
+        pass
+
+
+def replay_session(events, questions, pass_mark=PASS_MARK, adaptive=False, length=None):
+    """
+    Replays one recorded session against a question bank.
+    Questions are asked in order, as in the game, unless the session was adaptive;
+    then they are asked in the recorded order.
+    Args:
+        events (list): The session's events, as from `read_recording`.
+        questions (sequence): The question bank, normally a QuestionStore.
+        pass_mark (int, optional): Score needed to win.
+        adaptive (bool, optional): Whether the session picked its questions adaptively.
+        length (int, optional): Questions per game, if not every question.
+    Returns:
+        dict: answers replayed, recorded and replay seconds, and a list of mismatches.
+    """
+
+    started = time.perf_counter()
+    selector = ReplaySelector([event[3] for event in events if event[0] == ANSWER]) if adaptive else None
+    session = QuizSession(questions, pass_mark, selector=selector, length=length)
+    has_digests = hasattr(questions, "digest")
+    mismatches = []
+    answers = 0
+    if session.total != events[0][3]:
+        mismatches.append(f"game of {events[0][3]} questions replayed as a game of {session.total}")
+
+    for kind, argument, milliseconds, position, value in events[1:]:
+        if kind == QUESTION:
+            if position >= len(questions):
+                mismatches.append(f"question {position} is not in the bank ({len(questions)} questions)")
+                break
+            if has_digests and value and questions.digest(position) != value:
+                mismatches.append(f"question {position} differs from the recorded one")
+        elif kind == ANSWER:
+            if session.finished:
+                mismatches.append(f"answer at {milliseconds} ms after the game was over")
+                break
+            if session.position != position:
+                mismatches.append(f"answer {answers + 1}: recorded for question {position}, replayed on question {session.position}")
+            question = session.current()
+            index = argument & ~CORRECT
+            keys = list(question["answers"])
+            choice = keys[index] if index < len(keys) else None
+            correct = session.answer(choice, question=question)
+            answers += 1
+            if correct != bool(argument & CORRECT):
+                mismatches.append(f"answer {answers} to question {position}: recorded {'correct' if argument & CORRECT else 'wrong'}, replayed {'correct' if correct else 'wrong'}")
+        elif kind == END:
+            if not session.finished:
+                mismatches.append(f"game recorded as over after {answers} answers, but the replay is not finished")
+            if session.score != position or session.passed != bool(argument):
+                mismatches.append(f"final score: recorded {position} ({'won' if argument else 'lost'}), replayed {session.score} ({'won' if session.passed else 'lost'})")
+
+    return {
+        "answers": answers,
+        "recorded_seconds": (events[-1][2] - events[0][2]) / 1000,
+        "replay_seconds": time.perf_counter() - started,
+        "mismatches": mismatches,
+    }
+
+
+_worker_library = None
+_worker_questions = None
+
+
+def _init_worker(pack, root):
+    global _worker_library, _worker_questions
+    _worker_library = PackLibrary(root)
+    _worker_questions = QuestionStore(pack) if pack else None
+
+
+def _session_questions(pack):
+    # The pack a session is replayed on: the one given for every session, else the recorded one
+    if _worker_questions is not None:
+        return _worker_questions
+    language, _, topic = (pack or f"{DEFAULT_LANGUAGE}/{DEFAULT_TOPIC}").partition("/")
+    return _worker_library.get(language, topic)
+
+
+def _replay_file(task):
+    path, repeat = task
+    try:
+        header, sessions = read_recording(path)
+    except (OSError, ValueError) as e:
+        return path, [], str(e)
+    results = []
+    for _ in range(repeat):
+        for pack, events in sessions:
+            try:
+                questions = _session_questions(pack)
+            except (KeyError, OSError, ValueError) as e:
+                results.append({"answers": 0, "recorded_seconds": 0.0, "replay_seconds": 0.0, "mismatches": [f"cannot open pack {pack}: {e}"]})
+                continue
+            results.append(replay_session(events, questions, header["pass_mark"], header["adaptive"], header["length"]))
+    return path, results, None
+
+
+def replay(paths, pack=None, jobs=None, repeat=1, root=PACKS_ROOT):
+    """
+    Replays recordings across a pool of worker processes.
+    Args:
+        paths (list): Recording files.
+        pack (str, optional): Question pack to replay every session on. By default each
+            session is replayed on the pack it was recorded on, from `root`.
+        jobs (int, optional): Worker processes. Defaults to the number of CPUs; 1 replays in this process.
+        repeat (int, optional): Times each recording is replayed, for timing.
+        root (str, optional): Directory of the installed packs.
+    Yields:
+        tuple: (path, list of results from `replay_session`, error message or None), in no particular order.
+    """
+
+    jobs = jobs or os.cpu_count() or 1
+    tasks = [(path, repeat) for path in paths]
+    if jobs == 1:
+        _init_worker(pack, root)
+        yield from map(_replay_file, tasks)
+        return
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(pack, root)) as pool:
+        yield from pool.imap_unordered(_replay_file, tasks, chunksize=max(1, len(tasks) // (jobs * 8)))
+
+
+def _show(path):
+    header, sessions = read_recording(path)
+    print(f"{path}: {header}")
+    for number, (pack, events) in enumerate(sessions, start=1):
+        print(f"session {number} on {pack or 'the default pack'}")
+        for kind, argument, milliseconds, position, value in events:
+            detail = {
+                START: f"{position} questions",
+                QUESTION: f"position {position} digest {value:016x}",
+                ANSWER: f"position {position} choice {'-' if argument & ~CORRECT == NO_CHOICE else argument & ~CORRECT} {'correct' if argument & CORRECT else 'wrong'}",
+                FRAME: FRAMES[argument] if argument < len(FRAMES) else "?",
+                END: f"score {position} {'won' if argument else 'lost'}",
+            }.get(kind, "")
+            print(f"{milliseconds / 1000:10.3f}s  {KINDS[kind] if kind < len(KINDS) else kind:<8} {detail}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay and inspect recorded trivia sessions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay_parser = commands.add_parser("replay", help="push recordings through the game logic and check the results")
+    replay_parser.add_argument("recordings", nargs="*", help=f"recording files (default: every recording in {DEFAULT_DIRECTORY})")
+    replay_parser.add_argument("--pack", help="replay every session on this question pack instead of the one it was played on")
+    replay_parser.add_argument("--root", default=PACKS_ROOT, help="directory of the installed packs")
+    replay_parser.add_argument("--jobs", "-j", type=int, help="worker processes (default: number of CPUs)")
+    replay_parser.add_argument("--repeat", type=int, default=1, help="replay each recording this many times")
+
+    show_parser = commands.add_parser("show", help="print the events of a recording")
+    show_parser.add_argument("recording")
+
+    args = parser.parse_args(argv)
+    if args.command == "show":
+        _show(args.recording)
+        return 0
+
+    paths = args.recordings or sorted(glob.glob(os.path.join(DEFAULT_DIRECTORY, "*.nsqr")))
+    sessions = answers = failures = 0
+    recorded = replayed = 0.0
+    started = time.perf_counter()
+    for path, results, error in replay(paths, args.pack, args.jobs, args.repeat, args.root):
+        if error:
+            print(f"{path}: {error}", file=sys.stderr)
+            failures += 1
+            continue
+        # Repeats replay the same sessions, so only the first pass is reported
+        for number, result in enumerate(results[:len(results) // args.repeat], start=1):
+            for mismatch in result["mismatches"]:
+                print(f"{path}: session {number}: {mismatch}")
+            failures += 1 if result["mismatches"] else 0
+        sessions += len(results)
+        answers += sum(result["answers"] for result in results)
+        recorded += sum(result["recorded_seconds"] for result in results)
+        replayed += sum(result["replay_seconds"] for result in results)
+    elapsed = time.perf_counter() - started
+
+    print(f"Replayed {sessions} sessions ({answers} answers) from {len(paths)} recordings in {elapsed:.2f} s")
+    if replayed and recorded:
+        print(f"{answers / elapsed:.0f} answers/s, {recorded / replayed:.0f}x faster than the players")
+    print(f"{failures} session(s) did not replay as recorded" if failures else "Every session replayed as recorded")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
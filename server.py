@@ -0,0 +1,445 @@
+"""
+Quiz Server
+
+Serves the trivia questions to many players at once from a single process, e.g.
+a classroom of browsers. Every player gets an independent quiz session; all of
+them share one read-only, in-memory copy of the question bank.
+
+The server only scores answers and reports scores back. Playing through it never
+touches the files on the player's machine, and the server itself does not write
+anything to disk.
+
+Endpoints:
+- GET  /                          A small page to play in the browser (uses /ws).
+- GET  /ws                        WebSocket: send {"type": "start"} and {"type": "answer", "choice": "A"}.
+- POST /api/sessions              Starts a session; returns its ID and the first question.
+- POST /api/sessions/<id>/answer  Body {"choice": "A"}; returns the result and the next question.
+
+Classes:
+- QuestionBank: The shared, read-only questions.
+- PlayerSession: One player's quiz state.
+- QuizServer: asyncio HTTP/WebSocket server.
+
+Usage:
+python server.py [--host HOST] [--port PORT]
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import secrets
+import struct
+import time
+
+from question_store import DEFAULT_PACK, DEFAULT_SOURCE, QuestionStore
+from quiz import QuizSession
+
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC11B85"
+MAX_BODY = 64 * 1024
+MAX_SESSIONS = 100_000
+SESSION_TTL = 30 * 60
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Programmer's Squid game</title>
+<style>
+body { background: #242424; color: #dce4ee; font-family: sans-serif; max-width: 600px; margin: 40px auto; text-align: center; }
+label { display: block; text-align: left; margin: 12px 40px; font-size: 18px; }
+button { background: #2fa572; color: white; border: 0; border-radius: 6px; font-size: 20px; padding: 12px 40px; margin-top: 20px; }
+#feedback { height: 24px; }
+</style></head>
+<body>
+<h2 id="score">Programmer's Squid game</h2>
+<div id="progress"></div>
+<p id="question"></p>
+<form id="answers"></form>
+<div id="feedback"></div>
+<button id="next">Start</button>
+<script>
+const ws = new WebSocket(`ws://${location.host}/ws`);
+const $ = (id) => document.getElementById(id);
+let playing = false;
+ws.onmessage = (event) => {
+  const message = JSON.parse(event.data);
+  if (message.type === "result") {
+    $("feedback").textContent = message.correct ? "Correct!" : "Wrong!";
+    $("feedback").style.color = message.correct ? "green" : "red";
+  } else if (message.type === "question") {
+    playing = true;
+    $("score").textContent = `Score: ${message.score}`;
+    $("progress").textContent = `${message.number}/${message.total}`;
+    $("question").textContent = message.question;
+    $("answers").innerHTML = "";
+    for (const [key, text] of Object.entries(message.answers)) {
+      const label = document.createElement("label");
+      const input = document.createElement("input");
+      input.type = "radio"; input.name = "choice"; input.value = key;
+      label.append(input, ` ${text}`);
+      $("answers").append(label);
+    }
+    $("next").textContent = "Next";
+  } else if (message.type === "finished") {
+    playing = false;
+    $("score").textContent = `Final score: ${message.score}/${message.total}`;
+    $("question").textContent = message.passed ? "You passed!" : "You did not reach the required score.";
+    $("answers").innerHTML = "";
+    $("progress").textContent = "";
+    $("next").textContent = "Play Again";
+  }
+};
+$("next").onclick = () => {
+  if (!playing) { ws.send(JSON.stringify({type: "start"})); return; }
+  const choice = document.querySelector("input[name=choice]:checked");
+  ws.send(JSON.stringify({type: "answer", choice: choice ? choice.value : ""}));
+};
+</script>
+</body>
+</html>
+"""
+
+
+class QuestionBank:
+    """
+    Read-only questions shared by every session.
+    The public part of each question (no correct answer) is prepared once.
+    """
+
+    def __init__(self, questions):
+        """
+        Args:
+            questions (sequence): Question records with "question", "answers" and "correct".
+        """
+
+        questions = [questions[i] for i in range(len(questions))]
+        # QuizSession only needs the correct answer key
+        self._keys = tuple({"correct": question["correct"]} for question in questions)
+        self.public = tuple({"question": question["question"], "answers": question["answers"]} for question in questions)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __getitem__(self, position):
+        return self._keys[position]
+
+
+class PlayerSession(QuizSession):
+    """
+    A quiz session plus the time it was last used, for expiry.
+    """
+
+    __slots__ = ("last_seen",)
+
+    def __init__(self, bank):
+        super().__init__(bank)
+        self.last_seen = time.monotonic()
+
+
+class QuizServer:
+    """
+    asyncio HTTP and WebSocket server hosting many concurrent quiz sessions.
+    """
+
+    def __init__(self, bank, max_sessions=MAX_SESSIONS, session_ttl=SESSION_TTL):
+        """
+        Args:
+            bank (QuestionBank): The shared questions.
+            max_sessions (int, optional): Sessions kept at most; new ones are refused beyond that.
+            session_ttl (float, optional): Seconds of inactivity after which a session is dropped.
+        """
+
+        self.bank = bank
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.sessions = {}
+        self.finished = 0
+        self._server = None
+        self._reaper = None
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """
+        Starts listening.
+        Returns:
+            int: The port the server listens on (useful with port 0).
+        """
+
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=4096)
+        self._reaper = asyncio.create_task(self._reap())
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._reaper.cancel()
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(min(self.session_ttl, 60))
+            cutoff = time.monotonic() - self.session_ttl
+            for session_id in [key for key, session in self.sessions.items() if session.last_seen < cutoff]:
+                del self.sessions[session_id]
+
+    # Game messages, shared by HTTP and WebSocket
+
+    def _question(self, session):
+        return {"type": "question", "number": session.number, "total": session.total, "score": session.score, **self.bank.public[session.position]}
+
+    def _finished(self, session):
+        return {"type": "finished", "score": session.score, "total": session.total, "passed": session.passed}
+
+    def new_session(self):
+        """
+        Creates a session.
+        Returns:
+            tuple: (session ID, session), or (None, None) if the server is full.
+        """
+
+        if len(self.sessions) >= self.max_sessions:
+            return None, None
+        session_id = secrets.token_urlsafe(12)
+        session = self.sessions[session_id] = PlayerSession(self.bank)
+        return session_id, session
+
+    def answer(self, session_id, session, choice):
+        """
+        Scores an answer.
+        Returns:
+            list: The messages to send back: the result, then the next question or the final score.
+        """
+
+        session.last_seen = time.monotonic()
+        messages = [{"type": "result", "correct": session.answer(choice), "score": session.score}]
+        if session.finished:
+            self.finished += 1
+            logging.info(f"Session finished with score {session.score}/{session.total}")
+            del self.sessions[session_id]
+            messages.append(self._finished(session))
+        else:
+            messages.append(self._question(session))
+        return messages
+
+    # HTTP
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, path, version = request_line.split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request"}, keep_alive=False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "invalid content-length"}, keep_alive=False)
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, headers)
+                    break
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                status, payload = self._route(method, path, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, method, path, body):
+        if path == "/":
+            return (200, PAGE) if method == "GET" else (405, {"error": "method not allowed"})
+        if method != "POST":
+            return 405, {"error": "method not allowed"}
+
+        if path == "/api/sessions":
+            session_id, session = self.new_session()
+            if session is None:
+                return 503, {"error": "too many sessions"}
+            return 200, {"session": session_id, **self._question(session)}
+
+        parts = path.strip("/").split("/")
+        if len(parts) == 4 and parts[:2] == ["api", "sessions"] and parts[3] == "answer":
+            session = self.sessions.get(parts[2])
+            if session is None:
+                return 404, {"error": "unknown session"}
+            try:
+                choice = json.loads(body or b"{}").get("choice", "")
+            except (ValueError, AttributeError):
+                return 400, {"error": "body must be a JSON object"}
+            result, following = self.answer(parts[2], session, choice)
+            return 200, {**result, "next": following}
+
+        return 404, {"error": "not found"}
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive=True):
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/html; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    # WebSocket (RFC 6455, text frames only)
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key", "").encode("latin-1")
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest()).decode("ascii")
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
+
+        session_id = session = None
+        try:
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == 0x8:
+                    writer.write(encode_frame(b"", opcode=0x8))
+                    break
+                if opcode == 0x9:
+                    writer.write(encode_frame(payload, opcode=0xA))
+                    continue
+                if opcode != 0x1:
+                    continue
+
+                try:
+                    message = json.loads(payload)
+                except ValueError:
+                    continue
+                if not isinstance(message, dict):
+                    # Ignored like invalid JSON
+                    continue
+                if message.get("type") == "start":
+                    if session_id in self.sessions:
+                        del self.sessions[session_id]
+                    session_id, session = self.new_session()
+                    replies = [self._question(session)] if session else [{"type": "error", "error": "too many sessions"}]
+                elif message.get("type") == "answer" and session_id in self.sessions:
+                    replies = self.answer(session_id, session, message.get("choice", ""))
+                else:
+                    replies = [{"type": "error", "error": "send start first"}]
+                for reply in replies:
+                    writer.write(encode_frame(json.dumps(reply).encode("utf-8")))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.sessions.pop(session_id, None)
+
+
+async def read_frame(reader):
+    """
+    Reads one WebSocket frame.
+    Returns:
+        tuple: (opcode, unmasked payload bytes).
+    Raises:
+        ValueError: If the frame is larger than MAX_BODY.
+    """
+
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    if length > MAX_BODY:
+        raise ValueError("frame too large")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        # XOR the whole payload at once against the repeated mask
+        repeated = (mask * (length // 4 + 1))[:length]
+        payload = (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(length, "big")
+    return first & 0x0F, payload
+
+
+def encode_frame(payload, opcode=0x1, mask=False):
+    """
+    Encodes one unfragmented WebSocket frame. Clients must mask their frames, servers must not.
+    """
+
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length | (0x80 if mask else 0))
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126 | (0x80 if mask else 0), length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127 | (0x80 if mask else 0), length)
+    if not mask:
+        return header + payload
+    key = secrets.token_bytes(4)
+    repeated = (key * (length // 4 + 1))[:length]
+    masked = (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(length, "big")
+    return header + key + masked
+
+
+def load_bank(pack=DEFAULT_PACK, source=DEFAULT_SOURCE):
+    """
+    Loads the question bank once into memory.
+    """
+
+    store = QuestionStore(pack, source=source)
+    try:
+        return QuestionBank(store)
+    finally:
+        store.close()
+
+
+async def serve(host, port):
+    server = QuizServer(load_bank())
+    port = await server.start(host, port)
+    logging.info(f"Serving {len(server.bank)} questions on http://{host}:{port}/")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host trivia sessions for many players over HTTP and WebSocket.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (use 0.0.0.0 for a classroom network)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="{asctime} - {levelname} - {message}", style="{", datefmt="%Y-%m-%d %H:%M", level=logging.INFO)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+"""
+Telemetry
+
+Per-question answer-time and accuracy telemetry, to find the questions that are
+slow to answer or that mislead players.
+
+While a game runs, answers are aggregated into flat arrays allocated up front:
+per question answered since the last flush, the number of answers, wrong answers
+and timed answers, the sum of answer times, and a quantile sketch of answer
+times. Recording an answer only adds to these arrays. Periodically and when a
+game ends they are appended to the telemetry file as one batch and cleared, so
+memory stays fixed however long the game runs or however large the pack is, and
+a flush costs the same however much telemetry has been gathered before.
+
+The quantile sketch is a histogram with log-spaced buckets: bucket i > 0 counts
+answer times in [MIN_SECONDS * GROWTH^(i - 1), MIN_SECONDS * GROWTH^i). Quantiles
+read from it are within GROWTH - 1 (relative) of the exact value, and sketches of
+different runs add up exactly.
+
+Questions are identified by the digest of their record in the pack, so telemetry
+survives recompiling a pack and an edited question starts afresh.
+
+File layout (little endian): a header (magic, version, bucket count) followed by
+the batches. Each batch has a header (number of rows, CRC-32 of the rest of the
+batch) and the columns of its rows: digests, answers, wrong answers, timed
+answers, summed seconds and the sketches, row by row. Batches are merged by
+digest when the file is read; `compact` rewrites the file as a single batch. A
+batch cut short by a crash is dropped before the next one is appended.
+
+Classes:
+- AnswerTelemetry: Aggregates answers and flushes them to the telemetry file.
+
+Functions:
+- telemetry_path: The telemetry file of a pack.
+- read_table: Reads a telemetry file, merging its batches.
+- compact: Rewrites a telemetry file as a single batch.
+- quantile: Reads a quantile off a sketch.
+- rank: Ranks the questions of a pack by median answer time or error rate.
+
+Usage:
+python telemetry.py [PACK] [--by time|errors] [-n N] [--min-answers N] [--compact]
+"""
+import argparse
+import math
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from question_store import DEFAULT_PACK, QuestionStore
+
+
+MAGIC = b"NSQT"
+VERSION = 2
+BUCKETS = 48
+# Rows of aggregates kept between flushes; more distinct questions answered flush early
+ROWS = 1024
+MIN_SECONDS = 0.1
+GROWTH = 1.2
+FLUSH_MS = 30_000
+
+_HEADER = struct.Struct("<4sHH")
+_BATCH = struct.Struct("<II")
+_LOG_GROWTH = math.log(GROWTH)
+# Column order in a batch after the digests
+_COLUMNS = (("answered", "I"), ("wrong", "I"), ("timed", "I"), ("seconds", "d"))
+# Bytes per row of a batch, sketch included
+_ROW_SIZE = 8 + sum(array(typecode).itemsize for _, typecode in _COLUMNS) + 4 * BUCKETS
+
+
+def telemetry_path(pack):
+    """
+    Returns the telemetry file kept next to a pack: data/packs/en/computing.pack -> .telemetry.
+    """
+
+    return os.path.splitext(pack)[0] + ".telemetry"
+
+
+def bucket(seconds):
+    """
+    Returns the sketch bucket of an answer time.
+    """
+
+    if seconds < MIN_SECONDS:
+        return 0
+    return min(BUCKETS - 1, int(math.log(seconds / MIN_SECONDS) / _LOG_GROWTH) + 1)
+
+
+def quantile(sketch, q):
+    """
+    Estimates a quantile of the answer times counted in a sketch.
+    Args:
+        sketch (sequence): BUCKETS counts.
+        q (float): Quantile between 0 and 1, e.g. 0.5 for the median.
+    Returns:
+        float or None: Seconds, or None if the sketch is empty.
+    """
+
+    total = sum(sketch)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(sketch):
+        if count and seen + count >= rank:
+            if i == 0:
+                return MIN_SECONDS
+            # Interpolate geometrically inside the bucket
+            low = MIN_SECONDS * GROWTH ** (i - 1)
+            return low * GROWTH ** ((rank - seen) / count)
+        seen += count
+    return MIN_SECONDS * GROWTH ** (BUCKETS - 1)
+
+
+def _batches(f):
+    # Yields (rows, crc, body) for each complete batch after the file header
+    while True:
+        header = f.read(_BATCH.size)
+        if len(header) < _BATCH.size:
+            return
+        rows, crc = _BATCH.unpack(header)
+        body = f.read(rows * _ROW_SIZE)
+        if len(body) < rows * _ROW_SIZE:
+            return
+        yield rows, crc, body
+
+
+def _valid_header(f):
+    header = f.read(_HEADER.size)
+    return len(header) == _HEADER.size and _HEADER.unpack(header) == (MAGIC, VERSION, BUCKETS)
+
+
+def read_table(path):
+    """
+    Reads a telemetry file, merging its batches.
+    Args:
+        path (str): The file.
+    Returns:
+        dict: Column name ("digest", "answered", "wrong", "timed", "seconds", "sketch") to
+        array, all with one entry per question except "sketch", which has BUCKETS per question.
+        Empty if the file is missing or unreadable. Batches failing their checksum are skipped.
+    """
+
+    try:
+        with open(path, "rb") as f:
+            if not _valid_header(f):
+                return {}
+            table = _empty_table()
+            rows = {}
+            for count, crc, body in _batches(f):
+                if zlib.crc32(body) != crc:
+                    continue
+                batch = _unpack_batch(body, count)
+                sketch = table["sketch"]
+                for source, digest in enumerate(batch["digest"]):
+                    target = rows.get(digest)
+                    if target is None:
+                        target = rows[digest] = len(table["digest"])
+                        table["digest"].append(digest)
+                        for name, _ in _COLUMNS:
+                            table[name].append(batch[name][source])
+                        sketch.extend(batch["sketch"][source * BUCKETS:(source + 1) * BUCKETS])
+                        continue
+                    for name, _ in _COLUMNS:
+                        table[name][target] += batch[name][source]
+                    offset, target_offset = source * BUCKETS, target * BUCKETS
+                    for i in range(BUCKETS):
+                        sketch[target_offset + i] += batch["sketch"][offset + i]
+    except OSError:
+        return {}
+    return table
+
+
+def _unpack_batch(body, rows):
+    batch = {}
+    start = 0
+    for name, typecode in (("digest", "Q"), *_COLUMNS, ("sketch", "I")):
+        column = batch[name] = array(typecode)
+        size = column.itemsize * rows * (BUCKETS if name == "sketch" else 1)
+        column.frombytes(body[start:start + size])
+        start += size
+    return batch
+
+
+def _empty_table():
+    table = {"digest": array("Q"), "sketch": array("I")}
+    table.update((name, array(typecode)) for name, typecode in _COLUMNS)
+    return table
+
+
+def _pack_batch(columns, rows):
+    # columns: name to array holding at least `rows` rows
+    body = b"".join(
+        memoryview(columns[name])[:rows * (BUCKETS if name == "sketch" else 1)].tobytes()
+        for name in ("digest", *(name for name, _ in _COLUMNS), "sketch")
+    )
+    return _BATCH.pack(rows, zlib.crc32(body)) + body
+
+
+def compact(path):
+    """
+    Rewrites a telemetry file as a single batch, so it is read faster.
+    Returns:
+        int: Number of questions in the file.
+    """
+
+    table = read_table(path)
+    if not table:
+        return 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, BUCKETS) + _pack_batch(table, len(table["digest"])))
+    os.replace(tmp_path, path)
+    return len(table["digest"])
+
+
+class AnswerTelemetry:
+    """
+    Fixed-size aggregates of the answers given since the last flush.
+    Each question answered gets a row, up to `capacity` rows; when they are all
+    taken the aggregates are flushed early to make room.
+    """
+
+    def __init__(self, path, capacity=ROWS):
+        """
+        Args:
+            path (str): The telemetry file that flushes are appended to.
+            capacity (int, optional): Number of rows, i.e. distinct questions answered between flushes.
+        """
+
+        self.path = path
+        self.capacity = max(1, capacity)
+        self.digest = array("Q", bytes(8 * self.capacity))
+        self.answered = array("I", bytes(4 * self.capacity))
+        self.wrong = array("I", bytes(4 * self.capacity))
+        self.timed = array("I", bytes(4 * self.capacity))
+        self.seconds = array("d", bytes(8 * self.capacity))
+        self.sketch = array("I", bytes(4 * self.capacity * BUCKETS))
+        self._rows = {}
+        self._checked = False
+
+    def __len__(self):
+        return len(self._rows)
+
+    def record(self, digest, correct, seconds=None):
+        """
+        Adds one answer.
+        Args:
+            digest (int): Record digest of the answered question.
+            correct (bool): Whether the answer was correct.
+            seconds (float, optional): Time taken to answer.
+        """
+
+        row = self._rows.get(digest)
+        if row is None:
+            if len(self._rows) == self.capacity:
+                self.flush()
+            row = self._rows[digest] = len(self._rows)
+            self.digest[row] = digest
+        self.answered[row] += 1
+        if not correct:
+            self.wrong[row] += 1
+        if seconds is not None and seconds >= 0:
+            self.timed[row] += 1
+            self.seconds[row] += seconds
+            self.sketch[row * BUCKETS + bucket(seconds)] += 1
+
+    def _check_file(self, f):
+        # Once per instance: start the file afresh if it is not a telemetry file of
+        # this version, and drop a batch cut short by a crash so appends stay aligned
+        f.seek(0)
+        if not _valid_header(f):
+            f.truncate(0)
+            f.write(_HEADER.pack(MAGIC, VERSION, BUCKETS))
+            return
+        end = _HEADER.size
+        while True:
+            header = f.read(_BATCH.size)
+            if len(header) < _BATCH.size:
+                break
+            rows, _ = _BATCH.unpack(header)
+            size = _BATCH.size + rows * _ROW_SIZE
+            if end + size > os.fstat(f.fileno()).st_size:
+                break
+            end += size
+            f.seek(end)
+        f.truncate(end)
+
+    def flush(self):
+        """
+        Appends the aggregates to the telemetry file as one batch and clears them.
+        Returns:
+            int: Number of questions whose telemetry was written.
+        """
+
+        rows = len(self._rows)
+        if not rows:
+            return 0
+        batch = _pack_batch({name: getattr(self, name) for name in ("digest", *(name for name, _ in _COLUMNS), "sketch")}, rows)
+        with open(self.path, "ab+") as f:
+            if not self._checked:
+                self._check_file(f)
+                self._checked = True
+            f.write(batch)
+        for name, typecode in _COLUMNS:
+            column = getattr(self, name)
+            column[:rows] = array(typecode, bytes(column.itemsize * rows))
+        self.sketch[:rows * BUCKETS] = array("I", bytes(4 * rows * BUCKETS))
+        self._rows.clear()
+        return rows
+
+
+def rank(table, questions, by="time", min_answers=1):
+    """
+    Ranks the questions of a pack from their telemetry.
+    Args:
+        table (dict): Telemetry, as from `read_table`.
+        questions (QuestionStore): The pack; telemetry of questions no longer in it is ignored.
+        by (str, optional): "time" for slowest median answer time first, "errors" for highest error rate first.
+        min_answers (int, optional): Leave out questions answered fewer times.
+    Returns:
+        list: Dicts with position, key, question, answered, error_rate, mean, median and p90 (seconds).
+    """
+
+    positions = {questions.digest(position): position for position in range(len(questions))}
+    ranked = []
+    for row, digest in enumerate(table.get("digest", ())):
+        position = positions.get(digest)
+        answered = table["answered"][row]
+        if position is None or answered < min_answers:
+            continue
+        sketch = table["sketch"][row * BUCKETS:(row + 1) * BUCKETS]
+        timed = table["timed"][row]
+        entry = questions[position]
+        ranked.append({
+            "position": position,
+            "key": entry["key"],
+            "question": entry["question"],
+            "answered": answered,
+            "error_rate": table["wrong"][row] / answered,
+            "mean": table["seconds"][row] / timed if timed else None,
+            "median": quantile(sketch, 0.5),
+            "p90": quantile(sketch, 0.9),
+        })
+    if by == "errors":
+        ranked.sort(key=lambda entry: (-entry["error_rate"], -(entry["median"] or 0)))
+    else:
+        ranked.sort(key=lambda entry: (-(entry["median"] or 0), -entry["error_rate"]))
+    return ranked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank questions by answer time or error rate.")
+    parser.add_argument("pack", nargs="?", default=DEFAULT_PACK, help="question pack the telemetry was recorded on")
+    parser.add_argument("--telemetry", help="telemetry file (default: the pack's, with a .telemetry extension)")
+    parser.add_argument("--by", choices=["time", "errors"], default="time", help="slowest or most missed first")
+    parser.add_argument("-n", type=int, default=10, help="number of questions to show")
+    parser.add_argument("--min-answers", type=int, default=1, help="leave out questions answered fewer times")
+    parser.add_argument("--compact", action="store_true", help="first rewrite the telemetry file as a single batch")
+    args = parser.parse_args(argv)
+
+    path = args.telemetry or telemetry_path(args.pack)
+    if args.compact:
+        print(f"Compacted {path}: {compact(path)} questions", file=sys.stderr)
+    table = read_table(path)
+    store = QuestionStore(args.pack)
+    try:
+        ranked = rank(table, store, args.by, args.min_answers)
+    finally:
+        store.close()
+
+    if not ranked:
+        print("No telemetry recorded yet.")
+        return 0
+    print(f"{'#':>3}  {'key':<6} {'answers':>7} {'errors':>6} {'median':>7} {'p90':>7}  question")
+    for number, entry in enumerate(ranked[:args.n], start=1):
+        median = f"{entry['median']:.1f}s" if entry["median"] is not None else "-"
+        p90 = f"{entry['p90']:.1f}s" if entry["p90"] is not None else "-"
+        question = entry["question"] if len(entry["question"]) <= 60 else entry["question"][:57] + "..."
+        print(f"{number:>3}  {entry['key']:<6} {entry['answered']:>7} {entry['error_rate']:>6.0%} {median:>7} {p90:>7}  {question}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Text Layout
+
+Caches word-wrapped text so labels do not have to be re-measured every time they
+are shown. A layout is keyed by the text, the font and the available width
+rounded down to a bucket, so small width changes reuse the same layout.
+
+Classes:
+- LayoutCache: Bounded cache of wrapped lines and their measured height.
+"""
+from collections import OrderedDict
+
+
+# Widths are rounded down to multiples of this many pixels
+WIDTH_BUCKET = 20
+
+
+class LayoutCache:
+    """
+    Least-recently-used cache of text layouts.
+    Measuring goes through the font (any tkinter.font.Font, e.g. a CTkFont), which
+    does not query widget geometry.
+    """
+
+    def __init__(self, bucket=WIDTH_BUCKET, max_entries=512):
+        """
+        Args:
+            bucket (int, optional): Width rounding step, in pixels.
+            max_entries (int, optional): Number of layouts to keep.
+        """
+
+        self.bucket = bucket
+        self.max_entries = max_entries
+        self._layouts = OrderedDict()
+
+    def bucket_width(self, width):
+        """
+        Rounds a width down to its bucket, never below one bucket.
+        """
+
+        return max(self.bucket, int(width) // self.bucket * self.bucket)
+
+    def wrap(self, text, font, width):
+        """
+        Returns the layout of `text` in `font` within `width` pixels.
+        Args:
+            text (str): The text to lay out. Explicit newlines are kept.
+            font (tkinter.font.Font): The font the text is drawn in.
+            width (int): Available width in pixels; rounded down to its bucket.
+        Returns:
+            tuple: (lines, height) where lines is a tuple of str and height the
+            height in pixels of the wrapped text.
+        """
+
+        width = self.bucket_width(width)
+        key = (text, font.cget("family"), font.cget("size"), font.cget("weight"), font.cget("slant"), width)
+        layout = self._layouts.get(key)
+        if layout is not None:
+            self._layouts.move_to_end(key)
+            return layout
+
+        lines = []
+        for paragraph in text.split("\n"):
+            lines.extend(self._wrap_paragraph(paragraph, font, width))
+        layout = (tuple(lines), len(lines) * font.metrics("linespace"))
+
+        self._layouts[key] = layout
+        if len(self._layouts) > self.max_entries:
+            self._layouts.popitem(last=False)
+        return layout
+
+    @staticmethod
+    def _wrap_paragraph(paragraph, font, width):
+        lines, line = [], ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if font.measure(candidate) <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            # A word wider than the whole line is broken between characters
+            while font.measure(word) > width and len(word) > 1:
+                cut = len(word) - 1
+                while cut > 1 and font.measure(word[:cut]) > width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        lines.append(line)
+        return lines